@@ -20,28 +20,38 @@ def cleanup_module():
         if m.startswith(__name__):
             del sys.modules[m]
 
-import bpy
-from bpy.types import Operator
-from .operators import *
+from typing import TYPE_CHECKING
 
-classes = [
-    AnimationExporter,
-    SkinnedMeshImporter
-]
+if TYPE_CHECKING:
+    from bpy.types import Operator
 
-importers = \
-[
-    SkinnedMeshImporter
-]
+try:
+    import bpy
+except ModuleNotFoundError:
+    # Imported outside of Blender, e.g. to parse assets with the resources package
+    bpy = None
 
-exporters = \
-[
-    AnimationExporter
-]
+if bpy is not None:
+    from .operators import *
 
-classes = importers + exporters
+    classes = [
+        AnimationExporter,
+        SkinnedMeshImporter
+    ]
 
-def make_operator(operator: Operator):
+    importers = \
+    [
+        SkinnedMeshImporter
+    ]
+
+    exporters = \
+    [
+        AnimationExporter
+    ]
+
+    classes = importers + exporters
+
+def make_operator(operator: 'Operator'):
     def func(self, _):
         self.layout.operator(operator.bl_idname, text=f'{operator.bl_label} ({operator.filename_ext})')
     return func
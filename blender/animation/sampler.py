@@ -0,0 +1,161 @@
+import bpy
+import re
+import numpy as np
+from ...logger import Logger
+from ...transform.matrix_utility import MatrixUtility
+from ...resources.skeleton.kinematics import SkeletonKinematics
+
+class PoseSampler:
+    """
+        Samples armature pose of every frame into (F, B, 4, 4) arrays covering all pose bones.
+        
+        When nothing but the active action drives the pose, F-Curves are evaluated directly and
+        pose matrices are composed with numpy, without evaluating the scene for each frame.
+        Constraints, drivers, NLA and unsupported bone settings fall back to scene evaluation.
+    """
+    BonePath = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]\.(\w+)$')
+    
+    def __init__(self, object: bpy.types.Object, action: bpy.types.Action) -> None:
+        self.object = object
+        self.action = action
+        self.bones: list[bpy.types.PoseBone] = list(object.pose.bones)
+        self.index: dict[str, int] = {bone.name: i for i, bone in enumerate(self.bones)}
+        self.parents = np.array(
+            [self.index[bone.parent.name] if bone.parent else -1 for bone in self.bones], dtype=np.int64
+        )
+    
+    def direct_sampling_issue(self) -> str | None:
+        """Returns why F-Curves can't be evaluated directly, None if they can."""
+        animation_data = self.object.animation_data
+        
+        if len(animation_data.drivers) or (self.object.data.animation_data and len(self.object.data.animation_data.drivers)):
+            return "Armature has drivers"
+        
+        if any(not track.mute for track in animation_data.nla_tracks):
+            return "Armature has NLA tracks"
+        
+        if animation_data.action_blend_type != 'REPLACE' or animation_data.action_influence != 1:
+            return "Action is blended"
+        
+        for bone in self.bones:
+            if len(bone.constraints):
+                return f"Bone \"{bone.name}\" has constraints"
+            
+            if bone.rotation_mode == 'AXIS_ANGLE':
+                return f"Bone \"{bone.name}\" uses axis angle rotation"
+            
+            data = bone.bone
+            if not data.use_inherit_rotation or data.inherit_scale != 'FULL' or not data.use_local_location or data.use_relative_parent:
+                return f"Bone \"{bone.name}\" does not fully inherit parent transform"
+        
+        return None
+    
+    def sample(self, context: bpy.types.Context, first_frame: int, frames_count: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (F, B, 4, 4) pose matrices in armature space and (F, B, 4, 4) basis matrices of all pose bones."""
+        issue = self.direct_sampling_issue()
+        
+        if issue is None:
+            with Logger.timing("F-Curve sampling"):
+                return self.sample_fcurves(first_frame, frames_count)
+        
+        Logger.info(f"{issue}, sampling through scene evaluation")
+        with Logger.timing("Scene sampling"):
+            return self.sample_scene(context, first_frame, frames_count)
+    
+    def sample_scene(self, context: bpy.types.Context, first_frame: int, frames_count: int) -> tuple[np.ndarray, np.ndarray]:
+        """Evaluates the scene at every frame and captures matrices of all pose bones with one foreach_get per frame."""
+        pose = np.empty((frames_count, len(self.bones), 4, 4), dtype=np.float32)
+        basis = np.empty_like(pose)
+        pose_bones = self.object.pose.bones
+        
+        for i in range(frames_count):
+            Logger.progress("Sampling frame", i, ((frames_count - 1) == i))
+            
+            context.scene.frame_set(first_frame + i)
+            context.view_layer.update()
+            
+            pose_bones.foreach_get("matrix", pose[i].reshape(-1))
+            pose_bones.foreach_get("matrix_basis", basis[i].reshape(-1))
+        
+        # Blender stores matrices column by column
+        return (
+            pose.transpose(0, 1, 3, 2).astype(np.float64),
+            basis.transpose(0, 1, 3, 2).astype(np.float64)
+        )
+    
+    @staticmethod
+    def evaluate(fcurve: bpy.types.FCurve, frames: np.ndarray) -> np.ndarray:
+        """Evaluates F-Curve at every frame. Curves without modifiers which keys and handles hold one value are filled at once."""
+        keyframes = fcurve.keyframe_points
+        
+        if len(keyframes) and not len(fcurve.modifiers):
+            points = np.empty(len(keyframes) * 6, dtype=np.float32)
+            keyframes.foreach_get("co", points[:len(keyframes) * 2])
+            keyframes.foreach_get("handle_left", points[len(keyframes) * 2:len(keyframes) * 4])
+            keyframes.foreach_get("handle_right", points[len(keyframes) * 4:])
+            
+            values = points[1::2]
+            if (values == values[0]).all():
+                return np.full(len(frames), values[0], dtype=np.float64)
+        
+        return np.array([fcurve.evaluate(frame) for frame in frames.tolist()], dtype=np.float64)
+    
+    def evaluate_channels(self, frames: np.ndarray) -> dict[tuple[int, str], dict[int, np.ndarray]]:
+        """Evaluates bone F-Curves of the action, keyed by (bone index, property) and then by array index."""
+        channels: dict[tuple[int, str], dict[int, np.ndarray]] = {}
+        
+        for fcurve in self.action.fcurves:
+            match = PoseSampler.BonePath.match(fcurve.data_path)
+            if match is None or fcurve.mute:
+                continue
+            
+            name = re.sub(r'\\(.)', r'\1', match.group(1))
+            index = self.index.get(name)
+            if index is None:
+                continue
+            
+            channels.setdefault((index, match.group(2)), {})[fcurve.array_index] = PoseSampler.evaluate(fcurve, frames)
+        
+        return channels
+    
+    @staticmethod
+    def channel(channels: dict, index: int, property: str, default, frames_count: int) -> np.ndarray:
+        """Returns (F, n) values of bone property, components without F-Curve keep their current value."""
+        values = np.tile(np.array(default, dtype=np.float64), (frames_count, 1))
+        
+        for component, curve in channels.get((index, property), {}).items():
+            if component < values.shape[1]:
+                values[:, component] = curve
+        
+        return values
+    
+    def sample_fcurves(self, first_frame: int, frames_count: int) -> tuple[np.ndarray, np.ndarray]:
+        frames = np.arange(first_frame, first_frame + frames_count, dtype=np.float64)
+        channels = self.evaluate_channels(frames)
+        
+        basis = np.zeros((frames_count, len(self.bones), 4, 4), dtype=np.float64)
+        for i, bone in enumerate(self.bones):
+            location = PoseSampler.channel(channels, i, "location", bone.location, frames_count)
+            scale = PoseSampler.channel(channels, i, "scale", bone.scale, frames_count)
+            
+            if bone.rotation_mode == 'QUATERNION':
+                # Stored as (w, x, y, z)
+                rotation = PoseSampler.channel(channels, i, "rotation_quaternion", bone.rotation_quaternion, frames_count)
+                rotation = MatrixUtility.quaternion_to_matrix(np.roll(rotation, -1, axis=1))
+            else:
+                rotation = PoseSampler.channel(channels, i, "rotation_euler", bone.rotation_euler, frames_count)
+                rotation = MatrixUtility.euler_to_matrix(rotation, bone.rotation_mode)
+            
+            basis[:, i, :3, :3] = rotation * scale[:, np.newaxis, :]
+            basis[:, i, :3, 3] = location
+            basis[:, i, 3, 3] = 1
+        
+        # Rest matrices of bones relative to their parents
+        rest = np.array([bone.bone.matrix_local for bone in self.bones], dtype=np.float64).reshape(-1, 4, 4)
+        relative = rest.copy()
+        children = self.parents >= 0
+        relative[children] = np.linalg.inv(rest[self.parents[children]]) @ rest[children]
+        
+        pose = SkeletonKinematics(self.parents).world_matrices(relative @ basis)
+        
+        return pose, basis
\ No newline at end of file
@@ -0,0 +1 @@
+from .armature_utility import *
\ No newline at end of file
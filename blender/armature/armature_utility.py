@@ -0,0 +1,143 @@
+import bpy
+import numpy as np
+from ...logger import Logger
+from ..mesh.conversion import DataConversions
+from ...resources.skeleton import SkeletonAsset
+
+class ArmatureUtility:
+    """
+        Functions for building armatures out of skeleton assets.
+
+        Bind pose of all joints is computed with numpy first, Blender API is used only to create bones and assign computed values.
+    """
+    
+    @staticmethod
+    def bone_matrices(nor: np.ndarray) -> np.ndarray:
+        """Vectorized version of Blender's vec_roll_to_mat3_normalized with zero roll.
+        Returns (N, 3, 3) rotation matrices which Y axis points along each normalized (N, 3) direction."""
+        x, y, z = np.moveaxis(np.asarray(nor, dtype=np.float64), -1, 0)
+        
+        # Same thresholds as Blender uses for directions close to -Y
+        safe_threshold = 6.1e-3
+        critical_threshold = 2.5e-4
+        
+        theta = 1 + y
+        theta_alt = x * x + z * z
+        regular = (theta > safe_threshold) | (theta_alt > critical_threshold * critical_threshold)
+        theta = np.where(theta <= safe_threshold, theta_alt * 0.5 + theta_alt * theta_alt * 0.125, theta)
+        theta = np.where(regular, theta, 1)
+        
+        matrices = np.empty(x.shape + (3, 3), dtype=np.float64)
+        matrices[..., 0, 0] = 1 - x * x / theta
+        matrices[..., 0, 1] = x
+        matrices[..., 0, 2] = -x * z / theta
+        matrices[..., 1, 0] = -x
+        matrices[..., 1, 1] = y
+        matrices[..., 1, 2] = -z
+        matrices[..., 2, 0] = -x * z / theta
+        matrices[..., 2, 1] = z
+        matrices[..., 2, 2] = 1 - z * z / theta
+        
+        matrices[~regular] = np.diag([-1.0, -1.0, 1.0])
+        
+        return matrices
+    
+    @staticmethod
+    def bone_rolls(directions: np.ndarray, z_axes: np.ndarray) -> np.ndarray:
+        """Computes roll of each bone from its normalized (N, 3) direction and desired (N, 3) Z axis, like Blender's mat3_to_vec_roll."""
+        matrices = ArmatureUtility.bone_matrices(directions)
+        
+        # Roll matrix is inverse(bone matrix) @ target matrix, only its third column is needed
+        sin = np.einsum("...i,...i->...", matrices[..., :, 0], z_axes)
+        cos = np.einsum("...i,...i->...", matrices[..., :, 2], z_axes)
+        
+        return np.arctan2(sin, cos)
+    
+    @staticmethod
+    def bone_lengths(heads: np.ndarray, parents: np.ndarray) -> np.ndarray:
+        """Length of each bone is distance to its closest child.
+        Bones without children use median length of other bones, or 1 if there are none."""
+        lengths = np.full(len(heads), np.inf, dtype=np.float64)
+        
+        children = np.flatnonzero(parents >= 0)
+        distances = np.linalg.norm(heads[children] - heads[parents[children]], axis=1)
+        valid = distances > 1e-5
+        np.minimum.at(lengths, parents[children[valid]], distances[valid])
+        
+        finite = np.isfinite(lengths)
+        lengths[~finite] = np.median(lengths[finite]) if finite.any() else 1.0
+        
+        return lengths
+    
+    @staticmethod
+    def bind_pose(skeleton: SkeletonAsset) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Computes bind pose of all skeleton joints at once.
+        
+            World bind matrices are inverses of skeleton's inverse bind transforms.
+            Bone Y axis follows joint Y axis, roll keeps bone Z axis aligned with joint Z axis.
+            
+            Returns (J, 3) heads, (J, 3) tails, (J,) rolls in Blender space and (J,) parent indices, -1 for roots.
+        """
+        parents = skeleton.kinematics.parents
+        
+        matrices = np.linalg.inv(skeleton.inverse_bind_matrices())
+        heads = np.array(matrices[:, :3, 3])
+        
+        # Rows of axes are joint X, Y and Z axes in world space
+        axes = matrices[:, :3, :3].transpose(0, 2, 1)
+        axes = axes / np.linalg.norm(axes, axis=2, keepdims=True)
+        
+        DataConversions.use()
+        DataConversions.to_blender_location(heads)
+        DataConversions.to_blender_normals(axes)
+        
+        lengths = ArmatureUtility.bone_lengths(heads, parents)
+        tails = heads + axes[:, 1] * lengths[:, np.newaxis]
+        
+        rolls = ArmatureUtility.bone_rolls(axes[:, 1], axes[:, 2])
+        
+        return heads, tails, rolls, parents
+    
+    @staticmethod
+    def create_armature(
+        context: bpy.types.Context,
+        name: str,
+        skeleton: SkeletonAsset
+    ) -> bpy.types.Object:
+        """Creates armature object with a bone for each skeleton joint and links it to the scene.
+        All bones are created in a single edit mode session."""
+        Logger.info(f'Creating armature with name \"{name}\", joints: {len(skeleton.table)}')
+        
+        with Logger.timing("Bind pose"):
+            heads, tails, rolls, parents = ArmatureUtility.bind_pose(skeleton)
+        
+        armature = bpy.data.armatures.new(f"{name}-armature")
+        armature_object = bpy.data.objects.new(name, armature)
+        context.scene.collection.objects.link(armature_object)
+        
+        with Logger.timing("Bones"):
+            context.view_layer.objects.active = armature_object
+            bpy.ops.object.mode_set(mode='EDIT')
+            
+            edit_bones = armature.edit_bones
+            bones = [edit_bones.new(joint_name) for joint_name in skeleton.table.names]
+            
+            edit_bones.foreach_set("head", heads.astype(np.float32).ravel())
+            edit_bones.foreach_set("tail", tails.astype(np.float32).ravel())
+            edit_bones.foreach_set("roll", rolls.astype(np.float32))
+            
+            for bone, parent in zip(bones, parents.tolist()):
+                if parent >= 0:
+                    bone.parent = bones[parent]
+            
+            bpy.ops.object.mode_set(mode='OBJECT')
+        
+        return armature_object
+    
+    @staticmethod
+    def bind_object(object: bpy.types.Object, armature_object: bpy.types.Object):
+        """Parents object to armature and deforms it with armature modifier."""
+        object.parent = armature_object
+        
+        modifier = object.modifiers.new(name="Armature", type='ARMATURE')
+        modifier.object = armature_object
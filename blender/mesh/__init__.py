@@ -1,2 +1,3 @@
 from .conversion import *
-from .mesh_utility import *
\ No newline at end of file
+from .mesh_utility import *
+from .material_utility import *
\ No newline at end of file
@@ -2,43 +2,118 @@ import bpy
 import numpy as np
 
 class DataConversions:
-    inited = False
-    
+    """
+        Conversions between asset space and Blender space.
+
+        Axis swap (x, y, z) -> (x, -z, y) and unit scale are folded into one 3x3 matrix when `use()` is called,
+        every conversion is then a single in place matmul over the whole array. Each conversion has an exact inverse for export.
+    """
+
+    # Asset (x, y, z) -> Blender (x, -z, y)
+    axis_matrix = np.array([
+        [1, 0, 0],
+        [0, 0, -1],
+        [0, 1, 0]
+    ], dtype=np.float64)
+
+    # Left multiplication by (x, y, z, w) = (0, 1, 0, 0) quaternion, applied to root rotations on export
+    root_rotation_matrix = np.array([
+        [0, 0, 1, 0],
+        [0, 0, 0, 1],
+        [-1, 0, 0, 0],
+        [0, -1, 0, 0]
+    ], dtype=np.float64)
+
+    # Asset -> Blender, rotation part only and with unit scale
+    rotation_matrix = np.eye(3)
+    location_matrix = np.eye(3)
+    unit_scale = 1.0
+
     @staticmethod
     def use():
-        if DataConversions.inited: return
-        
-        if bpy.app.debug_value != 100:
-            scale_factor = 1.0 / bpy.context.scene.unit_settings.scale_length
-            
-            def to_blender_location(array: np.ndarray):
-                # x,y,z -> -x,-z,y
-                array[:, [1,2]] = array[:, [2,1]]
-                array[:, 1] *= -1
-                #array[:, 0] *= -1
-                
-                # Unit conversion
-                if scale_factor != 1: locs *= scale_factor
-                
-            def to_blender_normals(array: np.ndarray):
-                array[:, [1,2]] = array[:, [2,1]]
-                array[:, 1] *= -1
-                #array *= -1
-                
-            DataConversions.to_blender_location = to_blender_location
-            DataConversions.to_blender_normals = to_blender_normals
-    
-        DataConversions.inited = True
-        
+        """Recomputes conversion matrices from current scene settings. Debug value 100 disables conversion."""
+        if bpy.app.debug_value == 100:
+            DataConversions.unit_scale = 1.0
+            DataConversions.rotation_matrix = np.eye(3)
+        else:
+            DataConversions.unit_scale = 1.0 / bpy.context.scene.unit_settings.scale_length
+            DataConversions.rotation_matrix = DataConversions.axis_matrix
+
+        DataConversions.location_matrix = DataConversions.rotation_matrix * DataConversions.unit_scale
+
     @staticmethod
-    def flip_texcoord(array: np.ndarray):
-        array[:, 1] *= -1
-        array[:, 1] += 1
-        
+    def transform(array: np.ndarray, matrix: np.ndarray):
+        """Applies matrix to (..., n) row vectors of array in place."""
+        np.matmul(array, matrix.T.astype(array.dtype), out=array)
+
     @staticmethod
     def to_blender_location(array: np.ndarray):
-        return
-        
+        DataConversions.transform(array, DataConversions.location_matrix)
+
+    @staticmethod
+    def from_blender_location(array: np.ndarray):
+        DataConversions.transform(array, np.linalg.inv(DataConversions.location_matrix))
+
     @staticmethod
     def to_blender_normals(array: np.ndarray):
-        return
\ No newline at end of file
+        DataConversions.transform(array, DataConversions.rotation_matrix)
+
+    @staticmethod
+    def from_blender_normals(array: np.ndarray):
+        # Rotation matrix is orthogonal
+        DataConversions.transform(array, DataConversions.rotation_matrix.T)
+
+    @staticmethod
+    def to_blender_tangents(array: np.ndarray):
+        """Converts (N, 4) tangents, handedness is kept since conversion is a proper rotation."""
+        DataConversions.to_blender_normals(array[:, :3])
+
+    @staticmethod
+    def from_blender_tangents(array: np.ndarray):
+        DataConversions.from_blender_normals(array[:, :3])
+
+    @staticmethod
+    def to_blender_units(array: np.ndarray):
+        """Converts lengths which are not bound to asset axes, e.g. parent relative translations."""
+        array *= DataConversions.unit_scale
+
+    @staticmethod
+    def from_blender_units(array: np.ndarray):
+        array /= DataConversions.unit_scale
+
+    @staticmethod
+    def to_blender_rotations(array: np.ndarray):
+        """Converts (N, 4) quaternions in (x, y, z, w) order. Conjugating by a rotation only rotates the vector part."""
+        DataConversions.to_blender_normals(array[..., :3])
+
+    @staticmethod
+    def from_blender_rotations(array: np.ndarray):
+        DataConversions.from_blender_normals(array[..., :3])
+
+    @staticmethod
+    def from_blender_root_rotations(array: np.ndarray):
+        """Converts (N, 4) root bone basis rotations in (x, y, z, w) order to asset rotations."""
+        DataConversions.transform(array, DataConversions.root_rotation_matrix)
+
+    @staticmethod
+    def to_blender_root_rotations(array: np.ndarray):
+        # Inverse of an unit quaternion product matrix is its transpose
+        DataConversions.transform(array, DataConversions.root_rotation_matrix.T)
+
+    @staticmethod
+    def to_blender_matrices(array: np.ndarray):
+        """Converts (..., 4, 4) transform matrices by change of basis, rotations are conjugated and translations converted as locations."""
+        basis = np.eye(4)
+        basis[:3, :3] = DataConversions.location_matrix
+        array[...] = basis @ array @ np.linalg.inv(basis)
+
+    @staticmethod
+    def from_blender_matrices(array: np.ndarray):
+        basis = np.eye(4)
+        basis[:3, :3] = DataConversions.location_matrix
+        array[...] = np.linalg.inv(basis) @ array @ basis
+
+    @staticmethod
+    def flip_texcoord(array: np.ndarray):
+        array[:, 1] *= -1
+        array[:, 1] += 1
@@ -0,0 +1,10 @@
+import bpy
+from ...resources.mesh import MeshMaterialInstance
+
+class MaterialUtility:
+    @staticmethod
+    def produce_material(material: MeshMaterialInstance) -> bpy.types.Material:
+        blender_material = bpy.data.materials.new(material.name)
+        blender_material.use_nodes = True
+        
+        return blender_material
\ No newline at end of file
@@ -1,8 +1,11 @@
 import bpy
 import numpy as np
 from ...logger import Logger
+from ...hashing.rows import RowHash
 from .conversion import DataConversions
-from .material_instance import MeshMaterialInstance
+from .material_utility import MaterialUtility
+from ...resources.mesh import MeshMaterialInstance
+from ...resources.skinned_mesh import SkinnedMeshAsset
 
 class MeshUtility:
     """"
@@ -47,47 +50,115 @@ class MeshUtility:
         mesh.polygons.foreach_set('use_smooth', smooth)
     
     @staticmethod
-    def merge_primitive_vertices(
+    def weld_keys(
+        vertices: np.ndarray,
+        normals: np.ndarray = None,
+        texcoord: np.ndarray = None,
+        position_tolerance: float = None,
+        normal_tolerance: float = None,
+        uv_tolerance: float = None
+    ) -> np.ndarray:
+        """Quantizes vertex attributes into (N, k) int64 keys. Vertices with equal keys are welded.
+        Positions without tolerance are compared by their exact float32 bit patterns, normals are truncated like before."""
+        columns = []
+        
+        if position_tolerance is None:
+            # Adding zero turns -0.0 into 0.0, so both produce the same bits
+            columns.append(
+                (np.asarray(vertices, dtype=np.float32) + np.float32(0)).view(np.int32)
+            )
+        else:
+            columns.append(np.floor(vertices / position_tolerance))
+        
+        if normals is not None and normal_tolerance is not None:
+            columns.append(np.trunc(np.asarray(normals, dtype=np.float32) * np.float32(1 / normal_tolerance)))
+            
+        if texcoord is not None and uv_tolerance is not None:
+            columns.append(np.floor(texcoord / uv_tolerance))
+        
+        return np.concatenate(
+            [column.astype(np.int64) for column in columns], axis=1
+        )
+    
+    @staticmethod
+    def weld_primitive_vertices(
         vertices: np.ndarray,
         indices: np.ndarray,
         normals: np.ndarray = None,
+        texcoord: np.ndarray = None,
+        position_tolerance: float = None,
+        normal_tolerance: float = 1 / 50000,
+        uv_tolerance: float = None
     ):
-        if normals is not None:
-            normals *= 50000
-            normals[:] = np.trunc(normals)
-            normals *= (1/50000)
+        """Welds vertices with equal quantized position, normal and (optionally) per-vertex texcoord keys.
         
-        dot_fields = [('x', np.float32), ('y', np.float32), ('z', np.float32)]
-        if normals is not None:
-            dot_fields += [('nx', np.float32), ('ny', np.float32), ('nz', np.float32)]
-
-        dots = np.empty(len(vertices), dtype=np.dtype(dot_fields))
-        dots['x'] = vertices[:, 0]
-        dots['y'] = vertices[:, 1]
-        dots['z'] = vertices[:, 2]
-        
-        if normals is not None:
-            dots['nx'] = normals[:, 0]
-            dots['ny'] = normals[:, 1]
-            dots['nz'] = normals[:, 2]
+            Keys are hashed into one uint64 per vertex and deduplicated with a 1D unique instead of a lexicographic sort over records.
+            Hash collisions are detected and fall back to an exact unique over the keys. Input arrays are never modified.
             
-        unique_dots, unique_ind, inv_indices = np.unique(dots, return_index=True, return_inverse=True)
-
-        indices = inv_indices[indices]
-
-        vertices = np.empty((len(unique_dots), 3), dtype=np.float32)
-        vertices[:, 0] = unique_dots['x']
-        vertices[:, 1] = unique_dots['y']
-        vertices[:, 2] = unique_dots['z']
+            Returns welded vertices, remapped indices, quantized normals and index of the source vertex for each welded vertex.
+            Welded vertices keep the order of their first occurrence.
+        """
+        keys = MeshUtility.weld_keys(vertices, normals, texcoord, position_tolerance, normal_tolerance, uv_tolerance)
+        
+        first, inverse = RowHash.unique(keys)
+        
+        # Order welded vertices by first occurrence
+        order = np.argsort(first, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        
+        source = first[order]
+        indices = rank[inverse][indices]
         
+        welded_normals = None
         if normals is not None:
-            normals = np.empty((len(unique_dots), 3), dtype=np.float32)
-            normals[:, 0] = unique_dots['nx']
-            normals[:, 1] = unique_dots['ny']
-            normals[:, 2] = unique_dots['nz']
-            
+            if normal_tolerance is None:
+                welded_normals = np.array(normals[source], dtype=np.float32)
+            else:
+                welded_normals = keys[source, 3:6].astype(np.float32)
+                welded_normals *= normal_tolerance
+        
+        return np.array(vertices[source], dtype=np.float32), indices, welded_normals, source
+    
+    @staticmethod
+    def merge_primitive_vertices(
+        vertices: np.ndarray,
+        indices: np.ndarray,
+        normals: np.ndarray = None,
+    ):
+        vertices, indices, normals, _ = MeshUtility.weld_primitive_vertices(vertices, indices, normals)
         return vertices, indices, normals
     
+    @staticmethod
+    def is_primitive_valid(vertices: np.ndarray, faces_indices: np.ndarray) -> bool:
+        """Checks triangles with numpy for everything Mesh.validate() would fix:
+        non-finite positions, out of range indices, degenerate and duplicated triangles."""
+        if len(faces_indices) == 0:
+            return True
+        
+        if not np.isfinite(vertices).all():
+            return False
+        
+        if faces_indices.min() < 0 or faces_indices.max() >= len(vertices):
+            return False
+        
+        a, b, c = faces_indices.T
+        if np.any((a == b) | (b == c) | (a == c)):
+            return False
+        
+        faces = np.sort(faces_indices, axis=1).astype(np.int64)
+        return len(np.unique(faces, axis=0)) == len(faces)
+    
+    @staticmethod
+    def material_indices(materials: list[MeshMaterialInstance], faces_count: int) -> np.ndarray:
+        """Returns material index of each triangle. Triangles not covered by any material use the first one."""
+        triangles, counts = SkinnedMeshAsset.material_triangles(materials)
+        
+        material_indices = np.zeros(faces_count, dtype=np.int32)
+        material_indices[triangles] = np.repeat(np.arange(len(materials), dtype=np.int32), counts)
+        
+        return material_indices
+    
     @staticmethod
     def create_primitive(
         name: str,
@@ -97,66 +168,117 @@ class MeshUtility:
         texcoord: np.ndarray = None,
         normals: np.ndarray = None
     ):
-        Logger.info(f'Creating mesh with name \"{name}\", triangles: {len(indices) // 3}, UV: {texcoord is not None}, Normals: {normals is not None}, Materials: {len(materials)}')
+        Logger.info(f'Creating mesh with name \"{name}\", triangles: {len(indices)}, UV: {texcoord is not None}, Normals: {normals is not None}, Materials: {len(materials)}')
         
         primitive = bpy.data.meshes.new(name)
         
-        material_indices = np.empty(len(indices), dtype=np.uint32)
-        for i, material in enumerate(materials):
-            blender_material = material.produce_material()
-            primitive.materials.append(blender_material)
+        with Logger.timing("Materials"):
+            for material in materials:
+                primitive.materials.append(
+                    MaterialUtility.produce_material(material)
+                )
             
-            offset = material.indices_offset // 3
-            count = material.indices_count // 3
-        
-            material_indices[offset:offset + count].fill(i)
+            material_indices = MeshUtility.material_indices(materials, len(indices))
 
-        vertices, faces_indices, normals = MeshUtility.merge_primitive_vertices(
-            vertices, indices, normals
-        )
+        with Logger.timing("Vertex welding"):
+            vertices, faces_indices, normals, source = MeshUtility.weld_primitive_vertices(
+                vertices, indices, normals
+            )
         
-        DataConversions.use()
-        DataConversions.to_blender_location(vertices)
-        if normals is not None:
-            DataConversions.to_blender_normals(normals)
+        with Logger.timing("Coordinate conversion"):
+            DataConversions.use()
+            DataConversions.to_blender_location(vertices)
+            if normals is not None:
+                DataConversions.to_blender_normals(normals)
         
-        face_lengths = tuple(map(len, faces_indices))
-        vertices_len = len(vertices)
-        faces_len = len(faces_indices)
-
-        primitive.vertices.add(vertices_len)
-        primitive.loops.add(sum(face_lengths))
-        primitive.polygons.add(faces_len)
-
-        primitive.vertices.foreach_set("co", MeshUtility.squish(vertices))
-
-        vertex_indices = MeshUtility.squish(faces_indices)
-        loop_starts = np.arange(0, 3 * len(faces_indices), step=3)
+        with Logger.timing("Geometry"):
+            faces_len = len(faces_indices)
+            
+            primitive.vertices.add(len(vertices))
+            primitive.loops.add(3 * faces_len)
+            primitive.polygons.add(faces_len)
 
-        primitive.polygons.foreach_set("loop_start", loop_starts)
-        primitive.polygons.foreach_set("vertices", vertex_indices)
-        
-        primitive.polygons.foreach_set('material_index', material_indices)
+            primitive.vertices.foreach_set("co", MeshUtility.squish(vertices, np.float32))
+            
+            vertex_indices = MeshUtility.squish(faces_indices, np.int32)
+            primitive.loops.foreach_set("vertex_index", vertex_indices)
+            primitive.polygons.foreach_set("loop_start", np.arange(0, 3 * faces_len, step=3, dtype=np.int32))
+            primitive.polygons.foreach_set("loop_total", np.full(faces_len, 3, dtype=np.int32))
+            primitive.polygons.foreach_set("material_index", material_indices)
         
         if texcoord is not None:
-            texcoord = texcoord[MeshUtility.squish(indices)]
-            DataConversions.flip_texcoord(texcoord)
-            
-            uv_layer = primitive.uv_layers.new(name="UVMap")
-            uv_layer.data.foreach_set('uv', MeshUtility.squish(texcoord))
-            
+            with Logger.timing("Texcoord"):
+                texcoord = texcoord[MeshUtility.squish(indices)]
+                DataConversions.flip_texcoord(texcoord)
+                
+                uv_layer = primitive.uv_layers.new(name="UVMap")
+                uv_layer.data.foreach_set("uv", MeshUtility.squish(texcoord, np.float32))
+        
         # Not really necessary but ok
-        MeshUtility.set_primitive_smooth(primitive, normals, vertex_indices)
+        if normals is not None:
+            with Logger.timing("Smooth flags"):
+                MeshUtility.set_primitive_smooth(primitive, normals, vertex_indices)
 
-        primitive.update(
-            calc_edges=True,
-            calc_edges_loose=False,
-        )
-        primitive.validate()
+        with Logger.timing("Update"):
+            primitive.update(
+                calc_edges=True,
+                calc_edges_loose=False,
+            )
+            
+            if not MeshUtility.is_primitive_valid(vertices, faces_indices):
+                Logger.info("Mesh data is not well-formed, validating")
+                primitive.validate()
 
         if normals is not None:
-            primitive.create_normals_split()
-            primitive.normals_split_custom_set_from_vertices(normals)
-            primitive.use_auto_smooth = False
+            with Logger.timing("Custom normals"):
+                primitive.create_normals_split()
+                primitive.normals_split_custom_set_from_vertices(normals)
+                primitive.use_auto_smooth = False
+        
+        return primitive, source
+    
+    @staticmethod
+    def set_object_weights(
+        object: bpy.types.Object,
+        group_names: list[str],
+        groups: np.ndarray,
+        weights: np.ndarray,
+        weight_steps: int = None
+    ):
+        """Creates vertex group for each name and assigns (N, k) group indices with their weights to object vertices.
+        
+            Influences are grouped by (group, weight) pair, each pair takes one VertexGroup.add call for all of its vertices.
+            Exact weights only group rigid or repeated weights. With weight_steps, weights are rounded to multiples of
+            1 / weight_steps first, so a group needs at most weight_steps calls however many vertices it has.
+        """
+        vertex_groups = [object.vertex_groups.new(name=name) for name in group_names]
+        
+        vertices = np.repeat(np.arange(len(groups), dtype=np.int64), groups.shape[1])
+        groups = groups.astype(np.int64).ravel()
+        weights = np.asarray(weights, dtype=np.float32).ravel()
+        
+        if weight_steps is None:
+            # Positive float bits keep their order
+            levels = weights.view(np.int32).astype(np.int64)
+            influences = weights > 0
+        else:
+            levels = np.rint(weights * weight_steps).astype(np.int64)
+            influences = levels > 0
         
-        return primitive
\ No newline at end of file
+        vertices, groups, levels = vertices[influences], groups[influences], levels[influences]
+        
+        # One sortable key per (group, weight) pair
+        keys = (groups << 32) | levels
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        
+        vertices = vertices[order]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            index = order[start]
+            level = levels[index]
+            weight = float(np.int32(level).view(np.float32)) if weight_steps is None else level / weight_steps
+            
+            vertex_groups[groups[index]].add(vertices[start:end].tolist(), weight, "ADD")
\ No newline at end of file
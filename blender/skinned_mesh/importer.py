@@ -4,12 +4,15 @@ from pathlib import Path
 from ...resources.skeleton import SkeletonAsset
 from ...resources.skinned_mesh import SkinnedMeshAsset
 from ..mesh.mesh_utility import MeshUtility
+from ..armature.armature_utility import ArmatureUtility
+from ...logger import Logger
 
 class LolSceneSkinnedImportSettings:
     def __init__(self) -> None:
         self.skeleton_filepath: str = None
         self.skin_filepath: str = None
         self.split_materials: bool = None
+        self.quantize_weights: bool = None
 
 class LolSceneSkinnedImport:
     def __init__(self, config: LolSceneSkinnedImportSettings) -> None:
@@ -18,45 +21,74 @@ class LolSceneSkinnedImport:
         self.asset.read(config.skin_filepath)
         self.skeleton: SkeletonAsset  = None
         self.split_materials = config.split_materials
+        self.weight_steps = 255 if config.quantize_weights else None
         
         if config.skeleton_filepath is not None:
             self.skeleton = SkeletonAsset()
             self.skeleton.read(config.skeleton_filepath)
 
-    def import_primitive(self, context: bpy.types.Context) -> list[bpy.types.Mesh]:
+    def import_object(self, name: str, asset: SkinnedMeshAsset) -> bpy.types.Object:
+        primitive, source = MeshUtility.create_primitive(
+            f"{name}-mesh",
+            asset.materials,
+            asset.indices,
+            asset.vertices,
+            texcoord=asset.texcoord,
+            normals=asset.normals
+        )
+        
+        object = bpy.data.objects.new(name, primitive)
+        if self.skeleton is not None:
+            with Logger.timing("Skin weights"):
+                self.import_weights(object, asset, source)
+        
+        return object
+    
+    def import_weights(self, object: bpy.types.Object, asset: SkinnedMeshAsset, source: np.ndarray) -> None:
+        # Mesh bone indices point into skeleton influences list, which holds joint ids
+        influences = self.skeleton.joint_indices_from_ids(self.skeleton.vertex_weight_map)
+        bones = asset.bones[source]
+        
+        if len(bones) and bones.max() >= len(influences):
+            raise ValueError(f"Mesh references bone {bones.max()}, but skeleton has only {len(influences)} influences")
+        
+        if (influences < 0).any():
+            unknown = self.skeleton.vertex_weight_map[influences < 0]
+            raise ValueError(f"Skeleton influences reference unknown joint ids: {sorted(set(unknown.tolist()))}")
+        
+        if self.weight_steps is not None:
+            Logger.info(f"Rounding skin weights to 1/{self.weight_steps} steps")
+        
+        MeshUtility.set_object_weights(
+            object,
+            self.skeleton.joints_names,
+            influences[bones],
+            asset.weights[source],
+            self.weight_steps
+        )
+
+    def import_primitive(self, context: bpy.types.Context) -> list[bpy.types.Object]:
         if not self.split_materials:
-            primitive = MeshUtility.create_primitive(
-                f"{self.name}-mesh",
-                self.asset.materials,
-                self.asset.indices,
-                self.asset.vertices,
-                texcoord=self.asset.texcoord,
-                normals=self.asset.normals
-            )
-            
-            return [bpy.data.objects.new(self.name, primitive)]
+            return [self.import_object(self.name, self.asset)]
         
-        objects: list[bpy.types.Mesh] = []
-        for material in self.asset.materials:
-            material_object_name = f"{self.name}_{material.name}"
-            material_object = self.asset.from_material(material)
-            
-            primitive = MeshUtility.create_primitive(
-                f"{material_object_name}-mesh",
-                material_object.materials,
-                material_object.indices,
-                material_object.vertices,
-                texcoord=material_object.texcoord,
-                normals=material_object.normals
-            )
-            objects.append(
-                bpy.data.objects.new(material_object_name, primitive)
-            )
-            
-        return objects
+        return [
+            self.import_object(f"{self.name}_{material.name}", material_object)
+            for material, material_object in zip(self.asset.materials, self.asset.partition())
+        ]
+    
+    def import_armature(self, context: bpy.types.Context) -> bpy.types.Object:
+        with Logger.timing("Armature"):
+            return ArmatureUtility.create_armature(context, f"{self.name}_skeleton", self.skeleton)
     
     def import_scene(self, context: bpy.types.Context) -> None:
+        armature_object = None
+        if self.skeleton is not None:
+            armature_object = self.import_armature(context)
+        
         objects = self.import_primitive(context)
         
         for mesh in objects:
-            context.scene.collection.objects.link(mesh)
\ No newline at end of file
+            context.scene.collection.objects.link(mesh)
+            
+            if armature_object is not None:
+                ArmatureUtility.bind_object(mesh, armature_object)
\ No newline at end of file
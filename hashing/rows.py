@@ -0,0 +1,28 @@
+import numpy as np
+
+class RowHash:
+    """FNV-1a style hashing of (N, k) 64-bit integer rows into one uint64 per row, for 1D sorting and deduplication."""
+    
+    @staticmethod
+    def hash(keys: np.ndarray) -> np.ndarray:
+        # Overflow wraps around
+        hashes = np.full(len(keys), 0xCBF29CE484222325, dtype=np.uint64)
+        for column in keys.T:
+            hashes ^= column.view(np.uint64)
+            hashes *= np.uint64(0x100000001B3)
+            hashes ^= hashes >> np.uint64(29)
+        
+        return hashes
+    
+    @staticmethod
+    def unique(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Same as `np.unique(keys, axis=0, return_index=True, return_inverse=True)` without the unique rows, up to order of them.
+        Rows are deduplicated through their hashes, exact unique over rows only runs on hash collisions."""
+        _, first, inverse = np.unique(RowHash.hash(keys), return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        
+        if not np.array_equal(keys[first[inverse]], keys):
+            _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        
+        return first, inverse
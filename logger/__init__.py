@@ -1,9 +1,12 @@
 from enum import IntEnum
+from contextlib import contextmanager
 import sys
+import time
 
 class MessageLevel(IntEnum):
     Default = 0
     FatalError = 1
+    Timing = 2
 
 
 class Logger:
@@ -21,6 +24,8 @@ class Logger:
         typename = "LOG"
         if (level == MessageLevel.FatalError):
             typename = "ERROR"
+        elif (level == MessageLevel.Timing):
+            typename = "TIME"
 
         print(f"[{typename}] {txt}")
 
@@ -29,4 +34,11 @@ class Logger:
         sys.stdout.write('\r')
         delim = '\n' if is_final else ''
         sys.stdout.write(f"[PROGRESS] {message}: {value} {delim}")
-        sys.stdout.flush()
\ No newline at end of file
+        sys.stdout.flush()
+        
+    @staticmethod
+    @contextmanager
+    def timing(stage: str):
+        start = time.perf_counter()
+        yield
+        Logger.info(f"{stage}: {(time.perf_counter() - start) * 1000:.2f} ms", MessageLevel.Timing)
\ No newline at end of file
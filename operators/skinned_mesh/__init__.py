@@ -33,6 +33,12 @@ class SkinnedMeshImporter(Operator, ImportHelper):
         default=False
     )
     
+    quantize_weights: BoolProperty(
+        name="Quantize Weights",
+        description="Rounds skin weights to 1/255 steps, which makes assigning them much faster on dense meshes",
+        default=False
+    )
+    
     custom_skeleton: BoolProperty(
         name="Custom Skeleton",
         description="Uses selected .skl file as a skeleton file if active, otherwise it will use a .skl with same name as .skn",
@@ -49,6 +55,7 @@ class SkinnedMeshImporter(Operator, ImportHelper):
         
         config = LolSceneSkinnedImportSettings()
         config.split_materials = self.split_materials
+        config.quantize_weights = self.quantize_weights
         dirname = os.path.dirname(self.filepath)
         config.skin_filepath = [
             os.path.join(dirname, str(file.name))
@@ -1,21 +1,62 @@
-from .binary_reader import BinaryReader, Endian
-from mathutils import Vector, Quaternion
+from .binary_reader import BinaryReader, Endian, Whence
+from ..transform.vector import Vector
+from ..transform.quaternion import Quaternion
+import numpy as np
+from mmap import mmap as MemoryMap, ACCESS_READ
 
 class Stream(BinaryReader):
-    def __init__(self, buffer = bytearray(), endianness: Endian = Endian.LITTLE, encoding='utf-8'):
-        super().__init__(buffer, endianness, encoding)
+    def __init__(self, buffer = bytearray(), endianness: Endian = Endian.LITTLE, encoding='utf-8', copy: bool = True):
+        super().__init__(buffer, endianness, encoding, copy)
 
-    def read_vector(self) -> Vector:
-        return Vector(
-            (self.read_float(),
-            self.read_float(),
-            self.read_float())
+    @classmethod
+    def open(cls, filepath: str, mmap: bool = True, endianness: Endian = Endian.LITTLE, encoding='utf-8') -> 'Stream':
+        """Opens a read-only stream over the file at the given path.\n
+        If mmap is `True`, the file is memory-mapped instead of being read into memory,
+        so arrays read from the stream are views into the page cache. The mapping stays alive as long as the stream or any of these arrays.
+        """
+        with open(filepath, "rb") as file:
+            if mmap:
+                try:
+                    return cls(MemoryMap(file.fileno(), 0, access=ACCESS_READ), endianness, encoding, copy=False)
+                except (ValueError, OSError):
+                    # Empty files and special files cannot be mapped
+                    file.seek(0)
+
+            return cls(file.read(), endianness, encoding, copy=False)
+
+    def read_array(self, dtype: np.dtype, shape: int | tuple[int, ...]) -> np.ndarray:
+        """Reads an array with the given dtype and shape from the current position and advances the position past it.\n
+        The data is interpreted with the stream's endianness. If it matches the native byte order, a zero-copy view into the buffer is returned,
+        otherwise the whole array is byteswapped into a native copy at once.
+        """
+        order = ">" if self.endian() else "<"
+        dtype = np.dtype(dtype).newbyteorder(order)
+        count = int(np.prod(shape))
+        size = count * dtype.itemsize
+        
+        if self.pos() + size > self.size():
+            raise Exception(
+                'BinaryReader Error: cannot read farther than buffer length.')
+        
+        array = np.frombuffer(self.view(), dtype, count, self.pos())
+        self.seek(size, Whence.CUR)
+        
+        if not dtype.isnative:
+            array = array.astype(dtype.newbyteorder("="))
+        
+        return array.reshape(shape)
+    
+    def write_array(self, array: np.ndarray) -> None:
+        """Writes the contents of a numpy array with the stream's endianness, byteswapping it at once if needed."""
+        array = np.asarray(array)
+        order = ">" if self.endian() else "<"
+        
+        self.write_buffer(
+            np.ascontiguousarray(array, dtype=array.dtype.newbyteorder(order))
         )
+    
+    def read_vector(self) -> Vector:
+        return Vector(self.read_float(3))
         
     def read_quaternion(self) -> Quaternion:
-        return Quaternion(
-            (self.read_float(),
-            self.read_float(),
-            self.read_float(),
-            self.read_float())
-        )
\ No newline at end of file
+        return Quaternion(self.read_float(4))
\ No newline at end of file
@@ -3,10 +3,14 @@ __copyright__ = "Copyright 2021, SutandoTsukai181"
 __license__ = "MIT"
 __version__ = "1.4.3"
 
+import mmap
+import re
 import struct
+import sys
+import numpy as np
 from contextlib import contextmanager
 from enum import Flag, IntEnum
-from typing import Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 FMT = dict()
 for c in ["b", "B", "s"]:
@@ -18,6 +22,13 @@ for c in ["i", "I", "f"]:
 for c in ["q", "Q"]:
     FMT[c] = 8
 
+DTYPE = {
+    "b": "i1", "B": "u1",
+    "h": "i2", "H": "u2", "e": "f2",
+    "i": "i4", "I": "u4", "f": "f4",
+    "q": "i8", "Q": "u8",
+}
+
 
 class Endian(Flag):
     LITTLE = False
@@ -30,10 +41,139 @@ class Whence(IntEnum):
     END = 2
 
 
+class BrLayout:
+    """Declarative layout of a fixed-size record, compiled once into a `struct.Struct` (and a numpy dtype) per endianness.\n
+    Each field is a `(name, format)` pair, where format is a `struct` format without byte order, e.g. `"H"`, `"4s"` or `"3f"`.\n
+    Fields with a count greater than 1 are read as tuples, `s` fields are read as a single bytes object.\n
+    Fields named `None` are skipped when reading and written as zeros, `x` fields are padding.
+    """
+    __FIELD = re.compile(r'^(\d*)([a-zA-Z])$')
+
+    def __init__(self, *fields: Tuple[Optional[str], str]) -> None:
+        self.fields = fields
+        self.names: Tuple[str] = tuple(name for name, _ in fields if name is not None)
+        self.__structs: Dict[Endian, struct.Struct] = {}
+        self.__dtypes: Dict[Endian, np.dtype] = {}
+        self.__offsets: Dict[str, int] = {}
+        self.__slices = []
+        self.__codes = []
+
+        format = ''
+        index = 0
+        for name, field_format in fields:
+            match = BrLayout.__FIELD.match(field_format)
+            if match is None or (match.group(2) not in FMT and match.group(2) != 'x'):
+                raise Exception(
+                    f'BinaryReader Error: invalid layout field format "{field_format}".')
+
+            count = int(match.group(1) or 1)
+            code = match.group(2)
+            values = 0 if code == 'x' else 1 if code == 's' else count
+
+            if name is not None:
+                self.__offsets[name] = struct.calcsize('<' + format)
+                self.__slices.append((index, index + values, code == 's' or not match.group(1)))
+                self.__codes.append((count, code))
+            elif values:
+                self.__slices.append(None)
+                self.__codes.append((count, code))
+
+            index += values
+            format += field_format
+
+        self.format = format
+        self.size = struct.calcsize('<' + format)
+
+    def offset(self, name: str) -> int:
+        """Returns the offset of the given field from the start of the record."""
+        return self.__offsets[name]
+
+    def struct(self, endianness: Endian = Endian.LITTLE) -> struct.Struct:
+        """Returns the compiled `struct.Struct` of this layout for the given endianness."""
+        compiled = self.__structs.get(endianness)
+        if compiled is None:
+            compiled = struct.Struct((">" if endianness else "<") + self.format)
+            self.__structs[endianness] = compiled
+
+        return compiled
+
+    def dtype(self, endianness: Endian = Endian.LITTLE) -> np.dtype:
+        """Returns a numpy structured dtype of this layout for the given endianness.\n
+        Fields with a count greater than 1 become subarrays, unnamed fields and padding are left out.
+        """
+        dtype = self.__dtypes.get(endianness)
+        if dtype is None:
+            end = ">" if endianness else "<"
+            formats = []
+            for name, field_format in self.fields:
+                if name is None:
+                    continue
+
+                count, code = BrLayout.__FIELD.match(field_format).groups()
+                if code == 's':
+                    formats.append(f'S{count or 1}')
+                elif count:
+                    formats.append((end + DTYPE[code], (int(count),)))
+                else:
+                    formats.append(end + DTYPE[code])
+
+            dtype = np.dtype({
+                'names': list(self.names),
+                'formats': formats,
+                'offsets': [self.__offsets[name] for name in self.names],
+                'itemsize': self.size
+            })
+            self.__dtypes[endianness] = dtype
+
+        return dtype
+
+    def __group(self, values: tuple) -> tuple:
+        return tuple(
+            values[field[0]] if field[2] else values[field[0]:field[1]]
+            for field in self.__slices if field is not None
+        )
+
+    def unpack_from(self, buffer, offset: int = 0, endianness: Endian = Endian.LITTLE) -> tuple:
+        """Unpacks one record from the buffer at the given offset.\n
+        Returns the values of the named fields, in the order of `names`.
+        """
+        return self.__group(self.struct(endianness).unpack_from(buffer, offset))
+
+    def iter_unpack(self, buffer, offset: int, count: int, endianness: Endian = Endian.LITTLE):
+        """Unpacks `count` consecutive records from the buffer at the given offset, one tuple of named field values per record."""
+        block = memoryview(buffer)[offset : offset + self.size * count]
+        return map(self.__group, self.struct(endianness).iter_unpack(block))
+
+    def pack(self, values: Sequence, endianness: Endian = Endian.LITTLE) -> bytes:
+        """Packs the values of the named fields (in the order of `names`) into one record."""
+        flat = []
+        values = iter(values)
+        for field, (count, code) in zip(self.__slices, self.__codes):
+            if field is None:
+                flat.extend([b''] if code == 's' else [0] * count)
+            elif field[2]:
+                flat.append(next(values))
+            else:
+                flat.extend(next(values))
+
+        return self.struct(endianness).pack(*flat)
+
+    def assign(self, obj: Any, values: Sequence) -> None:
+        """Sets the named fields of the given object to the unpacked values."""
+        for name, value in zip(self.names, values):
+            setattr(obj, name, value)
+
+    def collect(self, obj: Any) -> tuple:
+        """Returns the values of the named fields of the given object, in the order of `names`."""
+        return tuple(getattr(obj, name) for name in self.names)
+
+
 class BrStruct:
     """Base class for objects passed to BinaryReader's `read_struct` and `write_struct` methods.\n
     Any type passed to `read_struct` and any object passed to `write_struct` must inherit from this class.\n
-    Override `__br_read__` and `__br_write__` methods from this class to set up BinaryReader to read your classes.\n"""
+    Override `__br_read__` and `__br_write__` methods from this class to set up BinaryReader to read your classes.\n
+    Alternatively, set `__br_layout__` to a BrLayout to read and write the whole record in one call.\n"""
+    __br_layout__: Optional[BrLayout] = None
 
     def __init__(self) -> None:
         """If this class will be used with BinaryReader's `read_struct` method, then this method MUST receive zero arguments after `self`.\n
@@ -47,8 +187,10 @@ class BrStruct:
         This parameter can be used to `read` the attributes of object.\n
         This method can take any number of parameters after the required first parameter.
         The additional arguments corresponding to these parameters should be passed to `BinaryReader.read_struct` after the `count` argument.\n
+        If `__br_layout__` is set, the default implementation reads all of its fields into the attributes of the object.\n
         """
-        pass
+        if self.__br_layout__ is not None:
+            self.__br_layout__.assign(self, br.read_layout(self.__br_layout__))
 
     def __br_write__(self, br: 'BinaryReader', *args) -> None:
         """Called once when `BinaryReader.write_struct` is called on an instance of this class.\n
@@ -57,24 +199,31 @@ class BrStruct:
         This parameter can be used to `write` the attributes of object.\n
         This method can take any number of parameters after the required first parameter.
         The additional arguments corresponding to these parameters should be passed to `BinaryReader.write_struct` after the `value` argument.\n
+        If `__br_layout__` is set, the default implementation writes all of its fields from the attributes of the object.\n
         """
-        pass
+        if self.__br_layout__ is not None:
+            br.write_layout(self.__br_layout__, self.__br_layout__.collect(self))
 
 
 class BinaryReader:
     """A buffer reader/writer containing a mutable bytearray.\n
-    Allows reading and writing various data types, while advancing the position of the buffer on each operation."""
-    __buf: bytearray
+    Allows reading and writing various data types, while advancing the position of the buffer on each operation.\n
+    Can also wrap an existing buffer without copying it, in which case the BinaryReader is read-only."""
+    __buf: Union[bytearray, memoryview]
     __idx: int
     __endianness: Endian
     __encoding: str
 
-    def __init__(self, buffer: bytearray = bytearray(), endianness: Endian = Endian.LITTLE, encoding='utf-8'):
+    def __init__(self, buffer: bytearray = bytearray(), endianness: Endian = Endian.LITTLE, encoding='utf-8', copy: bool = True):
         """Constructs a BinaryReader with the given buffer, endianness, and encoding and sets its position to 0.\n
         If buffer is not given, a new bytearray() is created. If endianness is not given, it is set to little endian.\n
-        Default encoding is UTF-8. Will throw an exception if encoding is unknown.
+        Default encoding is UTF-8. Will throw an exception if encoding is unknown.\n
+        If copy is `False`, the buffer (bytes, bytearray, mmap, memoryview or any other buffer object) is wrapped in a read-only memoryview instead of being copied.
         """
-        self.__buf = bytearray(buffer)
+        if copy:
+            self.__buf = bytearray(buffer)
+        else:
+            self.__buf = memoryview(buffer).toreadonly().cast('B')
         self.__endianness = endianness
         self.__idx = 0
         self.set_encoding(encoding)
@@ -83,7 +232,10 @@ class BinaryReader:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.__buf.clear()
+        if self.readonly():
+            self.__buf = memoryview(bytes())
+        else:
+            self.__buf.clear()
 
     def pos(self) -> int:
         """Returns the current position in the buffer."""
@@ -105,9 +257,24 @@ class BinaryReader:
         return len(self.__buf)
 
     def buffer(self) -> bytearray:
-        """Returns the buffer as a bytearray."""
+        """Returns a copy of the buffer as a bytearray."""
         return bytearray(self.__buf)
 
+    def view(self) -> memoryview:
+        """Returns a memoryview of the buffer without copying it.\n
+        The view is borrowed: while it (or any array created from it) is alive, a writable buffer cannot be resized.
+        """
+        return memoryview(self.__buf)
+
+    def readonly(self) -> bool:
+        """Returns True if the BinaryReader wraps a buffer that it does not own and cannot write to."""
+        return isinstance(self.__buf, memoryview)
+
+    def __check_writable(self) -> None:
+        if self.readonly():
+            raise Exception(
+                'BinaryReader Error: cannot modify a read-only buffer.')
+
     def pad(self, size: int) -> None:
         """Pads the buffer by 0s with the given size and advances the buffer position.\n
         Will advance the buffer position only if the position was at the end of the buffer.
@@ -115,7 +282,7 @@ class BinaryReader:
         if self.__idx == self.size():
             self.__idx += size
 
-        self.extend([0] * size)
+        self.extend(bytes(size))
 
     def align_pos(self, size: int) -> int:
         """Aligns the current position to the given size.\n
@@ -148,6 +315,7 @@ class BinaryReader:
         """Extends the BinaryReader's buffer with the given buffer.\n
         Does not advance buffer position.
         """
+        self.__check_writable()
         self.__buf.extend(buffer)
 
     def trim(self, size: int) -> int:
@@ -156,6 +324,7 @@ class BinaryReader:
         If the position of the buffer was in the trimmed range, it will be set to the end of the buffer.\n
         Returns the number of bytes removed.
         """
+        self.__check_writable()
         trimmed = 0
 
         if size >= 0:
@@ -207,6 +376,10 @@ class BinaryReader:
 
         self.__idx = prev_pos
 
+    def endian(self) -> Endian:
+        """Returns the endianness of the BinaryReader."""
+        return self.__endianness
+
     def set_endian(self, endianness: Endian) -> None:
         """Sets the endianness of the BinaryReader."""
         self.__endianness = endianness
@@ -239,6 +412,37 @@ class BinaryReader:
         """Reads a bytes object with the given size from the current position."""
         return self.__read_type("s", size)[0]
 
+    def __find(self, sub: bytes, start: int) -> int:
+        if not self.readonly():
+            return self.__buf.find(sub, start)
+
+        # Views spanning a whole bytes, bytearray or mmap are searched in place by their owner
+        owner = self.__buf.obj
+        if isinstance(owner, (bytes, bytearray, mmap.mmap)) and len(owner) == self.__buf.nbytes:
+            return owner.find(sub, start)
+
+        size = len(self.__buf)
+        if not sub:
+            return start if start <= size else -1
+
+        # Other buffers are scanned for the first byte through a numpy view in growing windows, without copying them
+        data = np.frombuffer(self.__buf, dtype=np.uint8)
+        pattern = np.frombuffer(sub, dtype=np.uint8)
+
+        position = start
+        window = 64
+        while position < size:
+            end = min(position + window, size)
+
+            for found in (np.flatnonzero(data[position:end] == pattern[0]) + position).tolist():
+                if np.array_equal(data[found:found + len(pattern)], pattern):
+                    return found
+
+            position = end
+            window *= 2
+
+        return -1
+
     def read_str(self, size=None, encoding=None) -> str:
         """Reads a string with the given size from the current position.\n
         If size is not given, will read until the first null byte (which the position will be set after).\n
@@ -247,14 +451,16 @@ class BinaryReader:
         encode = encoding or self.__encoding
 
         if size is None:
-            string = bytearray()
-            while self.__idx < len(self.__buf):
-                string.append(self.__buf[self.__idx])
-                self.__idx += 1
-                if string[-1] == 0:
-                    break
+            start = self.__idx
+            end = self.__find(b'\x00', start)
+
+            if end < 0:
+                end = len(self.__buf)
+                self.__idx = end
+            else:
+                self.__idx = end + 1
 
-            return string.split(b'\x00', 1)[0].decode(encode)
+            return str(self.__buf[start:end], encode)
 
         if size < 0:
             raise ValueError('size cannot be negative')
@@ -267,19 +473,42 @@ class BinaryReader:
         """
         encode = encoding or self.__encoding
 
-        i = 0
-        string = bytearray()
+        start = self.__idx
         token_bytes = token.encode(encode)
-        token_size = len(token_bytes)
-        while self.__idx < len(self.__buf):
-            string.append(self.__buf[self.__idx])
-            self.__idx += 1
-            if token_bytes == string[i : i + token_size]:
-                break
-            if len(string) >= token_size:
-                i += 1
+        end = self.__find(token_bytes, start)
+
+        if end < 0:
+            self.__idx = len(self.__buf)
+        else:
+            self.__idx = end + len(token_bytes)
+
+        return bytes(self.__buf[start:self.__idx]).split(b'\x00', 1)[0].decode(encode)
+
+    def read_string_table(self, offsets, encoding=None) -> List[str]:
+        """Reads the null-terminated strings at the given offsets in one pass, without changing the current position.\n
+        Each distinct offset is decoded only once, and decoded strings are interned, so repeated names share the same object.\n
+        If encoding is `None` (default), will use the BinaryReader's encoding.
+        """
+        encode = encoding or self.__encoding
+        size = len(self.__buf)
+        strings: Dict[int, str] = {}
+
+        result = []
+        for offset in offsets:
+            string = strings.get(offset)
+
+            if string is None:
+                if offset < 0 or offset > size:
+                    raise Exception(
+                        'BinaryReader Error: cannot read farther than buffer length.')
 
-        return string.split(b'\x00', 1)[0].decode(encode)
+                end = self.__find(b'\x00', offset)
+                string = sys.intern(str(self.__buf[offset:size if end < 0 else end], encode))
+                strings[offset] = string
+
+            result.append(string)
+
+        return result
 
     def read_int64(self, count=None) -> Union[int, Tuple[int]]:
         """Reads a signed 64-bit integer.\n
@@ -374,6 +603,15 @@ class BinaryReader:
         if count is not None:
             result = []
 
+            layout = cls.__br_layout__
+            if layout is not None and cls.__br_read__ is BrStruct.__br_read__:
+                for values in self.read_layout(layout, count):
+                    br_struct = cls()
+                    layout.assign(br_struct, values)
+                    result.append(br_struct)
+
+                return tuple(result)
+
             for _ in range(count):
                 br_struct = cls()
                 br_struct.__br_read__(self, *args)
@@ -386,29 +624,78 @@ class BinaryReader:
 
         return br_struct
 
-    def __write_type(self, format: str, value, is_iterable: bool) -> None:
+    def read_layout(self, layout: BrLayout, count=None) -> tuple:
+        """Reads a record with the given BrLayout in a single unpack call and returns the values of its named fields.\n
+        If count is given, will return a tuple of `count` records instead of 1 record.
+        """
+        i = self.__idx
+        new_offset = i + layout.size * (1 if count is None else count)
+
+        if self.__past_eof(new_offset):
+            raise Exception(
+                'BinaryReader Error: cannot read farther than buffer length.')
+
+        self.__idx = new_offset
+        if count is None:
+            return layout.unpack_from(self.__buf, i, self.__endianness)
+
+        return tuple(layout.iter_unpack(self.__buf, i, count, self.__endianness))
+
+    def __write_view(self, view) -> None:
+        self.__check_writable()
         i = self.__idx
+        size = len(view)
 
+        # Writing at the end appends to the bytearray, which grows its capacity geometrically
+        self.__buf[i : i + size] = view
+        self.__idx = i + size
+
+    def __write_type(self, format: str, value, is_iterable: bool) -> None:
         end = ">" if self.__endianness else "<"
 
         count = 1
         if is_iterable or type(value) is bytes:
             count = len(value)
 
-        if i + (FMT[format] * count) > len(self.__buf):
-            self.pad(FMT[format] * count)
-        else:
-            self.__idx += FMT[format] * count
-
         if is_iterable:
-            struct.pack_into(end + str(count) + format, self.__buf, i, *value)
+            self.__write_view(struct.pack(end + str(count) + format, *value))
         else:
-            struct.pack_into(end + str(count) + format, self.__buf, i, value)
+            self.__write_view(struct.pack(end + str(count) + format, value))
 
     def write_bytes(self, value: bytes) -> None:
         """Writes a bytes object to the buffer."""
         self.__write_type("s", value, is_iterable=False)
 
+    def write_buffer(self, buffer) -> None:
+        """Writes the contents of any C-contiguous buffer object (bytes, bytearray, memoryview, numpy array...) to the buffer.\n
+        Unlike `write_bytes`, the contents are copied directly without creating an intermediate bytes object.
+        """
+        self.__write_view(memoryview(buffer).cast('B'))
+
+    def reserve(self, size: int) -> int:
+        """Writes the given number of zero bytes as a placeholder to be filled later (e.g. with `patch_uint32`).\n
+        Returns the position of the placeholder.
+        """
+        offset = self.__idx
+        self.__write_view(bytes(size))
+        return offset
+
+    def patch_uint32(self, offset: int, value: int) -> None:
+        """Overwrites an unsigned 32-bit integer at the given offset, without changing the current position."""
+        self.__check_writable()
+
+        if offset < 0 or self.__past_eof(offset + 4):
+            raise Exception(
+                'BinaryReader Error: cannot patch farther than buffer length.')
+
+        struct.pack_into((">" if self.__endianness else "<") + "I", self.__buf, offset, value)
+
+    def dump(self, file) -> int:
+        """Writes the whole buffer to the given binary file handle without copying it.\n
+        Returns the number of bytes written.
+        """
+        return file.write(self.view())
+
     def write_str(self, string: str, null=False, encoding=None) -> int:
         """Writes a whole string to the buffer.\n
         If null is `True`, will append a null byte (`0x00`) after the string.\n
@@ -491,6 +778,10 @@ class BinaryReader:
         """
         self.__write_type("e", value, self.is_iterable(value))
 
+    def write_layout(self, layout: BrLayout, values: Sequence) -> None:
+        """Writes a record with the given BrLayout from the values of its named fields in a single pack call."""
+        self.write_bytes(layout.pack(values, self.__endianness))
+
     def write_struct(self, value: BrStruct, *args) -> None:
         """Calls the given value's `__br_write__` method.\n
         `value` must be an instance of a class that inherits BrStruct.\n
@@ -1,4 +1,6 @@
+import numpy as np
 from ...reader import Stream
+from ...reader.binary_reader import BrLayout
 from ...logger import Logger
 from ...transform.quantized_quaternion import QuantizedQuaternion
 from ...hashing.elf import Elf
@@ -9,6 +11,30 @@ class AnimationAsset:
     Magic = 'r3d2'
     UncompressedDataMagic = 'anmd'
     
+    FileHeader = BrLayout(
+        ("magic", "4s"),
+        ("data_magic", "4s"),
+        ("version", "I"),
+        # Data size, all data offsets are relative to this field
+        ("data_size", "I")
+    )
+    
+    UncompressedHeader = BrLayout(
+        # Format token, data version, flags
+        (None, "3I"),
+        ("joints_count", "I"),
+        ("frames_count", "I"),
+        ("frame_duration", "f"),
+        ("joints_offset", "I"),
+        # Asset name hash, asset time offset
+        (None, "2I"),
+        ("vectors_offset", "I"),
+        ("rotations_offset", "I"),
+        ("frame_data_offset", "I"),
+        # Reserved
+        (None, "12x")
+    )
+    
     def __init__(self) -> None:
         self.duration: int = 0
         self.fps: int = 30
@@ -16,103 +42,68 @@ class AnimationAsset:
         self.storage = TransformStorage()
 
     def write(self, write_compressed: bool = False) -> bytes:
-        stream = Stream()
-        
-        Logger.info(f"Writing Animation Asset with version - {AnimationAsset.Version}")
+        body = self.uncompressed_body()
+        return self.file_header(body) + body.tobytes()
+    
+    def write_file(self, filepath: str, write_compressed: bool = False) -> None:
+        body = self.uncompressed_body()
         
-        stream.write_str(AnimationAsset.Magic)
-        stream.write_str(AnimationAsset.UncompressedDataMagic) 
-        stream.write_uint32(AnimationAsset.Version)
+        with open(filepath, "wb") as file:
+            file.write(self.file_header(body))
+            file.write(body)
+    
+    def write_stream(self, stream: Stream, write_compressed: bool = False) -> None:
+        body = self.uncompressed_body()
         
-        data = self.write_uncompressed()
-        stream.write_uint32(len(data) + 4)
-        stream.write_bytes(data)
+        stream.write_buffer(self.file_header(body))
+        stream.write_buffer(body)
+    
+    def file_header(self, body: np.ndarray) -> bytes:
+        """Returns 16 bytes preceding uncompressed body: magics, version and data size."""
+        Logger.info(f"Writing Animation Asset with version - {AnimationAsset.Version}")
         
-        return bytes(stream.buffer())
+        return AnimationAsset.FileHeader.pack((
+            AnimationAsset.Magic.encode("ascii"),
+            AnimationAsset.UncompressedDataMagic.encode("ascii"),
+            AnimationAsset.Version,
+            4 + len(body)
+        ))
     
-    def write_uncompressed(self) -> bytes:
-        stream = Stream()
-
-        # Format Token
-        stream.write_uint32(0)
-
-        # Data Version
-        stream.write_uint32(0)
-
-        # Flags
-        stream.write_uint32(0)
+    def uncompressed_body(self) -> np.ndarray:
+        """Lays out uncompressed asset data following the data size field into one byte array.
         
-        # Joints count
-        stream.write_uint32(len(self.joints))
-
-        # Frames count
-        stream.write_uint32(self.duration)
-
-        # Frame duration
-        stream.write_float(1 / self.fps)
+            Sections are converted to contiguous little-endian arrays first and their offsets are computed from sizes,
+            so the whole body is assembled with one copy per section.
+        """
+        vectors = np.ascontiguousarray(self.storage.transforms, dtype="<f4")
+        rotations = QuantizedQuaternion.compress_array(self.storage.rotations)
+        joints = np.array([Elf.lower_hash(name) for name in self.joints], dtype="<u4")
+        indices = np.ascontiguousarray(self.storage.indices, dtype="<u2")
         
-        palette_buffer_size = 36
-        palette_base_offset = stream.pos() + palette_buffer_size + 4
-
-        palette = Stream()
-        #! Vectors
-        vectors_position  = palette.pos()
-        for vector in self.storage.transforms:
-            palette.write_float(vector.x)
-            palette.write_float(vector.y)
-            palette.write_float(vector.z)
-
-        #! Rotations
-        rotations_position = palette.pos()
-        for rotation in self.storage.rotations:
-            for byte in QuantizedQuaternion.compress([rotation.x, rotation.y, rotation.z, rotation.w]):
-                palette.write_uint8(byte)
-
-        #! Joint names
-        joints_offset = palette.pos()
-        for name in self.joints:
-            palette.write_uint32(Elf.lower_hash(name))
-
-        #! Frame indices
-        frame_data_offset = palette.pos()
-        palette.write_bytes(
-            self.storage.indices.tobytes()
-        )
-        #for _ in range(self.duration):
-        #    for t in range(len(self.joints)):
-        #        # Translation index
-        #        palette.write_uint16(self.transformations.translation_indices[frame_elements_offset + t])
-#
-        #        # Scale index
-        #        palette.write_uint16(self.transformations.scale_indices[frame_elements_offset + t])
-        #        
-        #        # Rotation index 
-        #        palette.write_uint16(self.transformations.rotation_indices[frame_elements_offset + t])
-        #        
-        #    frame_elements_offset += len(self.joints)
-
+        # Offsets are relative to the data size field, which precedes the header
+        vectors_offset = 4 + AnimationAsset.UncompressedHeader.size
+        rotations_offset = vectors_offset + vectors.nbytes
+        joints_offset = rotations_offset + rotations.nbytes
+        frame_data_offset = joints_offset + joints.nbytes
         
-        # Name hashes offfset
-        stream.write_uint32(joints_offset + palette_base_offset)
-
-        # Asset Name Hash
-        stream.write_uint32(0)
-
-        # Asset Time Offset
-        stream.write_uint32(0)
-
-        # Vectors
-        stream.write_uint32(vectors_position + palette_base_offset)
-
-        # Rotations Vector
-        stream.write_uint32(rotations_position + palette_base_offset)
-
-        # Frame Data
-        stream.write_uint32(frame_data_offset + palette_base_offset)
-
-        # Reserved
-        stream.write_bytes(bytes(12))
+        header = AnimationAsset.UncompressedHeader.pack((
+            len(self.joints),
+            self.duration,
+            1 / self.fps,
+            joints_offset,
+            vectors_offset,
+            rotations_offset,
+            frame_data_offset
+        ))
         
-        stream.write_bytes(bytes(palette.buffer()))
+        body = np.empty(frame_data_offset - 4 + indices.nbytes, dtype=np.uint8)
+        for offset, section in (
+            (4, np.frombuffer(header, dtype=np.uint8)),
+            (vectors_offset, vectors),
+            (rotations_offset, rotations),
+            (joints_offset, joints),
+            (frame_data_offset, indices)
+        ):
+            body[offset - 4:offset - 4 + section.nbytes] = section.reshape(-1).view(np.uint8)
         
-        return bytes(stream.buffer())
+        return body
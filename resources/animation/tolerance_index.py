@@ -0,0 +1,306 @@
+from itertools import product
+from math import floor, isclose, isinf, isnan, log
+import numpy as np
+from ...hashing.rows import RowHash
+
+class ToleranceIndex:
+    """Approximate match index over palette values, finds the same matches as `math.isclose` with relative tolerance on every component.
+        
+        Two nonzero values are close only if they have the same sign and their logarithms differ by at most -log(1 - tolerance).
+        Values are hashed into log-space grid cells twice that wide, so a lookup probes the value's cell and at most one neighbour per component.
+        Candidates are verified with `math.isclose` and the lowest matching index wins, like a linear scan over the palette.
+        
+        `first_fit` runs the same grid over whole numpy arrays, for packing many values at once.
+    """
+    
+    def __init__(self, tolerance: float) -> None:
+        self.tolerance = tolerance
+        self.values: list[tuple[float, ...]] = []
+        self.cells: dict[tuple, list[int]] = {}
+        
+        # Tolerance of 1 and above allows values with different signs to match, no grid for that
+        self.linear = tolerance >= 1
+        self.exact = tolerance <= 0
+        
+        if not (self.linear or self.exact):
+            self.radius = -log(1 - tolerance)
+            self.width = 2 * self.radius
+            
+            # Slightly enlarged, so rounding in log never hides a neighbour
+            self.probe_radius = self.radius * (1 + 1e-9) + 1e-12
+            
+            # Cells of `first_fit` are wider, most components then need no neighbour probe
+            self.grid_width = 4 * self.width
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def component_keys(self, value: float) -> list[tuple] | None:
+        """Returns cell keys to probe for a single component, first one is the component's own cell. None for NaN, which never matches."""
+        # -0.0 == 0.0, zero matches only zero
+        if value == 0:
+            return [(0, 0)]
+        
+        if isnan(value):
+            return None
+        
+        sign = 1 if value > 0 else -1
+        if isinf(value):
+            return [(2 * sign, 0)]
+        
+        if self.exact:
+            return [(sign, value)]
+        
+        position = log(abs(value)) / self.width
+        cell = floor(position)
+        keys = [(sign, cell)]
+        
+        offset = (position - cell) * self.width
+        if offset <= self.probe_radius:
+            keys.append((sign, cell - 1))
+        if self.width - offset <= self.probe_radius:
+            keys.append((sign, cell + 1))
+        
+        return keys
+    
+    def is_close(self, value: tuple[float, ...], other: tuple[float, ...]) -> bool:
+        if self.exact:
+            return value == other
+        
+        return all(isclose(a, b, rel_tol=self.tolerance) for a, b in zip(value, other))
+    
+    def find(self, value: tuple[float, ...]) -> int | None:
+        """Returns index of the first palette value close to given one, None if there is no such value."""
+        if self.linear:
+            for i, other in enumerate(self.values):
+                if self.is_close(value, other):
+                    return i
+            return None
+        
+        keys = [self.component_keys(component) for component in value]
+        if None in keys:
+            return None
+        
+        found = None
+        for cell in product(*keys):
+            # Indices in cells are ascending, nothing past the current best can win
+            for index in self.cells.get(cell, ()):
+                if found is not None and index >= found:
+                    break
+                
+                if self.is_close(value, self.values[index]):
+                    found = index
+                    break
+        
+        return found
+    
+    def add(self, value: tuple[float, ...]) -> int:
+        """Appends value to the palette and returns its index."""
+        index = len(self.values)
+        self.values.append(value)
+        
+        if not self.linear:
+            keys = [self.component_keys(component) for component in value]
+            if None not in keys:
+                self.cells.setdefault(tuple(key[0] for key in keys), []).append(index)
+        
+        return index
+    
+    def __grid_cells(self, values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized `component_keys` for (N, k) values over `grid_width` cells. Returns (N, k) int64 codes of own cells, (N, k) masks of lower
+        and upper neighbours to probe and (N,) mask of rows without NaN. Neighbour cell codes differ by 5."""
+        width = self.grid_width
+        regular = np.isfinite(values) & (values != 0)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            position = np.log(np.abs(values)) / width
+            cell = np.where(regular, np.floor(position), 0)
+            offset = (position - cell) * width
+        
+        lower = regular & (offset <= self.probe_radius)
+        upper = regular & (width - offset <= self.probe_radius)
+        
+        # Zero is 0, finite values +-1 and infinities +-2, same as in component_keys
+        sign = np.sign(np.nan_to_num(values, nan=0, posinf=2, neginf=-2)) * np.where(np.isinf(values), 2, 1)
+        codes = cell.astype(np.int64) * 5 + (sign + 2).astype(np.int64)
+        
+        return codes, lower, upper, ~np.isnan(values).any(axis=1)
+    
+    def __close_arrays(self, values: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """Row-wise `is_close` of two (N, k) float64 arrays, evaluated like `math.isclose`."""
+        with np.errstate(invalid="ignore"):
+            difference = np.abs(values - others)
+            close = (values == others) | (
+                np.isfinite(values) & np.isfinite(others) & (
+                    (difference <= self.tolerance * np.abs(others)) | (difference <= self.tolerance * np.abs(values))
+                )
+            )
+        
+        return close.all(axis=1)
+    
+    def first_fit(self, palette: np.ndarray, values: np.ndarray, chunk: int = 8192) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized sequence of `find` and `add` for (N, k) values against (M, k) palette, ignoring values held by this index.
+        
+            Returns index of every value in palette followed by appended values and mask of values which were appended.
+            Values are fitted in chunks, first against every entry before the chunk at once. Values left without a match
+            can only match each other, they are fitted the same way in smaller chunks until few enough to compare all pairs.
+        """
+        palette = np.asarray(palette, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        
+        if self.linear or self.exact:
+            indices = np.empty(len(values), dtype=np.int64)
+            added = np.zeros(len(values), dtype=bool)
+            
+            index = ToleranceIndex(self.tolerance)
+            for value in palette.tolist():
+                index.add(tuple(value))
+            
+            for i, value in enumerate(values.tolist()):
+                value = tuple(value)
+                found = index.find(value)
+                
+                added[i] = found is None
+                indices[i] = index.add(value) if found is None else found
+            
+            return indices, added
+        
+        # Cells of palette and values are computed once, then both are referred to by their row in points
+        points = np.concatenate([palette, values])
+        codes, lower, upper, valid = self.__grid_cells(points)
+        
+        rows = np.flatnonzero(valid[len(palette):]) + len(palette)
+        probes = codes[rows]
+        for component in range(codes.shape[1]):
+            base_rows, base = rows, probes
+            for step, mask in ((-5, lower), (5, upper)):
+                select = mask[base_rows, component]
+                shifted = base[select]
+                shifted[:, component] += step
+                
+                rows = np.concatenate([rows, base_rows[select]])
+                probes = np.concatenate([probes, shifted])
+        
+        # Cells are looked up by hashed codes, collisions only bring extra candidates
+        order = np.argsort(rows, kind="stable")
+        probes = RowHash.hash(probes[order])
+        bounds = np.searchsorted(rows[order], np.arange(len(points) + 1))
+        
+        keys = np.where(valid, RowHash.hash(codes), 0)
+        grid = (points, keys, valid, probes, bounds)
+        
+        return self.__fit(grid, np.arange(len(palette), len(points)), np.arange(len(palette)), chunk)
+    
+    def __close_pairs(self, grid: tuple, ids: np.ndarray, entries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (position in ids, position in entries) pairs of all close points, found through grid cells."""
+        points, keys, valid, probes, bounds = grid
+        
+        entry_positions = np.flatnonzero(valid[entries])
+        entry_keys = keys[entries[entry_positions]]
+        
+        order = np.argsort(entry_keys)
+        entry_keys, entry_positions = entry_keys[order], entry_positions[order]
+        
+        # Entries of each cell are contiguous
+        starts = np.flatnonzero(np.r_[True, entry_keys[1:] != entry_keys[:-1]])[:len(entry_keys)]
+        counts = np.diff(np.r_[starts, len(entry_keys)])
+        cell_keys = entry_keys[starts]
+        
+        # Probes of each id are contiguous too
+        probe_counts = bounds[ids + 1] - bounds[ids]
+        rows = np.repeat(np.arange(len(ids)), probe_counts)
+        if len(cell_keys) == 0 or len(rows) == 0:
+            return rows[:0], rows[:0]
+        
+        probe_offsets = np.cumsum(probe_counts) - probe_counts
+        cell_probes = probes[np.arange(len(rows)) - np.repeat(probe_offsets - bounds[ids], probe_counts)]
+        
+        cells = np.minimum(np.searchsorted(cell_keys, cell_probes), len(cell_keys) - 1)
+        hit = cell_keys[cells] == cell_probes
+        rows, cells = rows[hit], cells[hit]
+        
+        # Every entry of every probed cell becomes a candidate
+        counts = counts[cells]
+        offsets = np.cumsum(counts) - counts
+        found = entry_positions[np.arange(int(counts.sum())) - np.repeat(offsets - starts[cells], counts)]
+        rows = np.repeat(rows, counts)
+        
+        close = self.__close_arrays(points[ids[rows]], points[entries[found]])
+        return rows[close], found[close]
+    
+    def __fit(self, grid: tuple, ids: np.ndarray, entries: np.ndarray, chunk: int) -> tuple[np.ndarray, np.ndarray]:
+        indices = np.empty(len(ids), dtype=np.int64)
+        added = np.zeros(len(ids), dtype=bool)
+        
+        for start in range(0, len(ids), chunk):
+            block = ids[start:start + chunk]
+            
+            # Lowest close entry of each point
+            rows, found = self.__close_pairs(grid, block, entries)
+            order = np.lexsort((found, rows))
+            rows, found = rows[order], found[order]
+            _, first = np.unique(rows, return_index=True)
+            
+            fitted = np.full(len(block), -1, dtype=np.int64)
+            fitted[rows[first]] = found[first]
+            
+            pending = np.flatnonzero(fitted < 0)
+            if chunk > 128:
+                local, appended = self.__fit(grid, block[pending], entries[:0], chunk // 8)
+            else:
+                local, appended = self.__resolve(grid, block[pending])
+            
+            fitted[pending] = len(entries) + local
+            
+            indices[start:start + len(block)] = fitted
+            added[start + pending[appended]] = True
+            entries = np.concatenate([entries, block[pending[appended]]])
+        
+        return indices, added
+    
+    def __resolve(self, grid: tuple, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """`__fit` of a few points against no entries by comparing all their close pairs at once.
+        
+            A point is appended once none of its close predecessors is appended and takes the first appended one otherwise.
+            Rounds decide every point whose predecessors are decided, chains left after that are finished one point at a time.
+        """
+        count = len(ids)
+        nodes, predecessors = self.__close_pairs(grid, ids, ids)
+        
+        earlier = predecessors < nodes
+        nodes, predecessors = nodes[earlier], predecessors[earlier]
+        
+        # 0 is undecided, 1 appended, 2 merged
+        state = np.zeros(count, dtype=np.int8)
+        
+        for _ in range(16):
+            undecided = state == 0
+            if not undecided.any():
+                break
+            
+            predecessor_state = state[predecessors]
+            merged = np.zeros(count, dtype=bool)
+            merged[nodes[predecessor_state == 1]] = True
+            blocked = np.zeros(count, dtype=bool)
+            blocked[nodes[predecessor_state == 0]] = True
+            
+            state[undecided & merged] = 2
+            state[undecided & ~merged & ~blocked] = 1
+        
+        order = np.argsort(nodes, kind="stable")
+        nodes, predecessors = nodes[order], predecessors[order]
+        bounds = np.searchsorted(nodes, np.arange(count + 1))
+        
+        for point in np.flatnonzero(state == 0).tolist():
+            candidates = predecessors[bounds[point]:bounds[point + 1]]
+            state[point] = 2 if (state[candidates] == 1).any() else 1
+        
+        # Merged points take the rank of their first appended predecessor
+        appended = state == 1
+        indices = np.cumsum(appended) - 1
+        
+        targets = np.arange(count)
+        select = appended[predecessors]
+        np.minimum.at(targets, nodes[select], predecessors[select])
+        
+        return indices[targets], appended
@@ -1,106 +1,331 @@
-from mathutils import Vector, Quaternion
-from math import isclose
+from ...transform.vector import Vector
+from ...transform.quaternion import Quaternion
 import numpy as np
+from ...reader import Stream
+from ...hashing.rows import RowHash
+from .tolerance_index import ToleranceIndex
 
 class TransformStorage:
+    """Palette of translations, scales and rotations with per frame indices into it.
+        
+        Palettes are struct-of-arrays: (capacity, 3) vectors and (capacity, 4) rotations in (x, y, z, w) order,
+        stored as float32 like in the asset and grown geometrically, so appending is amortized O(1).
+        Translations and scales share the vectors palette.
+    """
     TransformTolerance = 0.0375
     RotationTolerance = 0.00385
     
     def __init__(self) -> None:
-        self.transforms: list[Vector] = []
-        self.rotations: list[Quaternion] = []
+        self.__transforms = np.zeros((0, 3), dtype=np.float32)
+        self.__transforms_count = 0
+        
+        self.__rotations = np.zeros((0, 4), dtype=np.float32)
+        self.__rotations_count = 0
         
-        self.translation_indices: list[int] = []
-        self.scale_indices: list[int] = []
-        self.rotation_indices: list[int] = []
+        # Bumped whenever a palette is replaced, invalidates lookup caches
+        self.__generation = 0
         
         self.indices: np.ndarray = np.array([], dtype=np.uint16)
         
-    def indices_from_buffer(self, data: bytes, offset: int, frames_count: int, joints_count: int) -> None:
-        array = np.frombuffer(data, offset=offset, dtype=np.uint16, count=(frames_count * joints_count) * 3)
-        self.indices = np.reshape(array, (frames_count * joints_count, 3))
+        self.__transforms_index: tuple[int, ToleranceIndex] = None
+        self.__rotations_index: tuple[int, ToleranceIndex] = None
         
+        self.__transforms_keys: tuple[int, dict[tuple, int], int] = None
+        self.__rotations_keys: tuple[int, dict[tuple, int], int] = None
+    
+    @property
+    def transforms(self) -> np.ndarray:
+        """(N, 3) float32 palette of translations and scales."""
+        return self.__transforms[:self.__transforms_count]
+    
+    @transforms.setter
+    def transforms(self, value: np.ndarray) -> None:
+        self.__transforms = np.array(value, dtype=np.float32).reshape(-1, 3)
+        self.__transforms_count = len(self.__transforms)
+        self.__generation += 1
+    
+    @property
+    def rotations(self) -> np.ndarray:
+        """(N, 4) float32 palette of rotations in (x, y, z, w) order."""
+        return self.__rotations[:self.__rotations_count]
+    
+    @rotations.setter
+    def rotations(self, value: np.ndarray) -> None:
+        self.__rotations = np.array(value, dtype=np.float32).reshape(-1, 4)
+        self.__rotations_count = len(self.__rotations)
+        self.__generation += 1
+    
+    def indices_from_buffer(self, data: bytes, offset: int, frames_count: int, joints_count: int) -> None:
+        stream = Stream(data, copy=False)
+        stream.seek(offset)
+        self.indices_from_stream(stream, frames_count, joints_count)
+    
+    def indices_from_stream(self, stream: Stream, frames_count: int, joints_count: int) -> None:
+        self.indices = stream.read_array(np.uint16, (frames_count * joints_count, 3))
+    
     def indices_from_count(self, frames_count: int, joints_count: int) -> None:
         self.indices = np.zeros((frames_count * joints_count, 3), dtype=np.uint16)
+    
+    @staticmethod
+    def vector_components(value: Vector) -> tuple[float, float, float]:
+        """Components of a vector or (3,) array as float32 values, the precision they are stored with."""
+        if hasattr(value, "x"):
+            value = (value.x, value.y, value.z)
+        
+        return tuple(np.array(value, dtype=np.float32).tolist())
+    
+    @staticmethod
+    def quaternion_components(value: Quaternion) -> tuple[float, float, float, float]:
+        """Components of a quaternion or (4,) array in (x, y, z, w) order as float32 values.
+        Attributes are used when present, `mathutils.Quaternion` iterates in (w, x, y, z) order."""
+        if hasattr(value, "w"):
+            value = (value.x, value.y, value.z, value.w)
+        
+        return tuple(np.array(value, dtype=np.float32).tolist())
+    
+    @staticmethod
+    def __grow(palette: np.ndarray, count: int, required: int) -> np.ndarray:
+        if required <= len(palette):
+            return palette
+        
+        grown = np.empty((max(required, 2 * len(palette), 16), palette.shape[1]), dtype=palette.dtype)
+        grown[:count] = palette[:count]
+        return grown
+    
+    def add_transforms(self, values: np.ndarray) -> np.ndarray:
+        """Appends (N, 3) translations or scales to the palette and returns their indices."""
+        values = np.asarray(values, dtype=np.float32).reshape(-1, 3)
+        start = self.__transforms_count
+        end = start + len(values)
+        
+        self.__transforms = TransformStorage.__grow(self.__transforms, start, end)
+        self.__transforms[start:end] = values
+        self.__transforms_count = end
         
+        return np.arange(start, end)
+    
+    def add_rotations(self, values: np.ndarray) -> np.ndarray:
+        """Appends (N, 4) rotations in (x, y, z, w) order to the palette and returns their indices."""
+        values = np.asarray(values, dtype=np.float32).reshape(-1, 4)
+        start = self.__rotations_count
+        end = start + len(values)
+        
+        self.__rotations = TransformStorage.__grow(self.__rotations, start, end)
+        self.__rotations[start:end] = values
+        self.__rotations_count = end
+        
+        return np.arange(start, end)
+    
+    def __add_transform(self, value: Vector) -> int:
+        index = self.__transforms_count
+        self.__transforms = TransformStorage.__grow(self.__transforms, index, index + 1)
+        self.__transforms[index] = TransformStorage.vector_components(value)
+        self.__transforms_count += 1
+        return index
+    
+    def __add_rotation(self, value: Quaternion) -> int:
+        index = self.__rotations_count
+        self.__rotations = TransformStorage.__grow(self.__rotations, index, index + 1)
+        self.__rotations[index] = TransformStorage.quaternion_components(value)
+        self.__rotations_count += 1
+        return index
+    
     def add_translation(self, value: Vector, offset: int):
-        index = len(self.transforms)
+        index = self.__add_transform(value)
         self.set_translation_index(index, offset)
-        self.transforms.append(value)
         return index
     
     def set_translation_index(self, index: int, offset: int):
-        self.indices[offset][0] = index
+        self.indices[offset, 0] = index
+    
+    def set_translation_indices(self, indices: np.ndarray, offsets: np.ndarray = slice(None)):
+        """Assigns translation indices to many frame elements at once, all of them by default."""
+        self.indices[offsets, 0] = indices
     
     def add_scale(self, value: Vector, offset: int):
-        index = len(self.transforms)
+        index = self.__add_transform(value)
         self.set_scale_index(index, offset)
-        self.transforms.append(value)
         return index
     
     def set_scale_index(self, index: int, offset: int):
-        self.indices[offset][1] = index
+        self.indices[offset, 1] = index
+    
+    def set_scale_indices(self, indices: np.ndarray, offsets: np.ndarray = slice(None)):
+        self.indices[offsets, 1] = indices
     
     def add_rotation(self, value: Quaternion, offset: int):
-        index = len(self.rotations)
+        index = self.__add_rotation(value)
         self.set_rotation_index(index, offset)
-        self.rotations.append(value)
         return index
     
     def set_rotation_index(self, index: int, offset: int):
-        self.indices[offset][2] = index
+        self.indices[offset, 2] = index
+    
+    def set_rotation_indices(self, indices: np.ndarray, offsets: np.ndarray = slice(None)):
+        self.indices[offsets, 2] = indices
+    
+    def __catch_up(self, cache: tuple[int, ToleranceIndex], palette: np.ndarray, tolerance: float) -> tuple[int, ToleranceIndex]:
+        """Indexes palette values appended since last lookup. Index is rebuilt if palette or tolerance was replaced."""
+        if cache is None or cache[0] != self.__generation or cache[1].tolerance != tolerance or len(cache[1]) > len(palette):
+            cache = (self.__generation, ToleranceIndex(tolerance))
+        
+        index = cache[1]
+        for value in palette[len(index):].tolist():
+            index.add(tuple(value))
+        
+        return cache
+    
+    def find_transform_approx(self, value: Vector) -> int | None:
+        """Returns index of the first translation or scale close to value under `TransformTolerance`."""
+        self.__transforms_index = self.__catch_up(
+            self.__transforms_index, self.transforms, TransformStorage.TransformTolerance
+        )
+        return self.__transforms_index[1].find(TransformStorage.vector_components(value))
+    
+    def find_rotation_approx(self, value: Quaternion) -> int | None:
+        """Returns index of the first rotation close to value under `RotationTolerance`."""
+        self.__rotations_index = self.__catch_up(
+            self.__rotations_index, self.rotations, TransformStorage.RotationTolerance
+        )
+        return self.__rotations_index[1].find(TransformStorage.quaternion_components(value))
+    
+    def __catch_up_keys(self, cache: tuple[int, dict[tuple, int], int], palette: np.ndarray) -> tuple[int, dict[tuple, int], int]:
+        """Maps exact values appended since last lookup to their first index. Rebuilt if palette was replaced.
+        Float keys hash and compare like ==, so -0.0 finds 0.0. Values with NaN never compare equal and are not mapped."""
+        if cache is None or cache[0] != self.__generation or cache[2] > len(palette):
+            cache = (self.__generation, {}, 0)
+        
+        keys = cache[1]
+        for i, key in enumerate(palette[cache[2]:].tolist(), cache[2]):
+            key = tuple(key)
+            if all(component == component for component in key):
+                keys.setdefault(key, i)
+        
+        return (self.__generation, keys, len(palette))
+    
+    def find_transform(self, value: Vector) -> int | None:
+        """Returns index of the first translation or scale equal to value."""
+        self.__transforms_keys = self.__catch_up_keys(self.__transforms_keys, self.transforms)
+        return self.__transforms_keys[1].get(TransformStorage.vector_components(value))
+    
+    def find_rotation(self, value: Quaternion) -> int | None:
+        """Returns index of the first rotation equal to value."""
+        self.__rotations_keys = self.__catch_up_keys(self.__rotations_keys, self.rotations)
+        return self.__rotations_keys[1].get(TransformStorage.quaternion_components(value))
+    
+    @staticmethod
+    def __first_equal(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """For every value finds the first value equal to it.
+        Returns index of that value and mask of values which are the first of their kind."""
+        # Adding zero turns -0.0 into 0.0, values with NaN never compare equal so they get a unique key
+        keys = (values + np.float32(0)).view(np.uint32).astype(np.int64)
+        unique = np.where(np.isnan(values).any(axis=1), np.arange(len(values)), -1)
+        keys = np.concatenate([keys, unique[:, np.newaxis]], axis=1)
+        
+        first, inverse = RowHash.unique(keys)
+        first = first[inverse]
+        
+        return first, first == np.arange(len(values))
+    
+    def __pack_approx(self, values: np.ndarray, vectors: bool) -> np.ndarray:
+        """Maps (N, k) values to palette indices, same as calling `set_*_approx` for each of them in order.
+        Exact duplicates are merged with np.unique first, distinct values are then fitted with `ToleranceIndex.first_fit`."""
+        first, new = TransformStorage.__first_equal(values)
+        
+        if vectors:
+            palette, add, tolerance = self.transforms, self.add_transforms, TransformStorage.TransformTolerance
+        else:
+            palette, add, tolerance = self.rotations, self.add_rotations, TransformStorage.RotationTolerance
+        
+        # Lookup indices catch up with appended values on their next use
+        distinct = values[new]
+        fitted, added = ToleranceIndex(tolerance).first_fit(palette, distinct)
+        add(distinct[added])
+        
+        indices = np.empty(len(values), dtype=np.int64)
+        indices[new] = fitted
+        return indices[first]
+    
+    def pack_frames(self, translations: np.ndarray, scales: np.ndarray, rotations: np.ndarray) -> tuple[float, float]:
+        """Fills palettes and the (F * J, 3) index table from (F, J, 3) translations and scales and (F, J, 4) rotations at once.
+        
+            Values are merged under `TransformTolerance` and `RotationTolerance` with the same result as calling
+            `set_*_approx` for every frame element in order, translation before scale.
+            Returns max absolute error introduced by merging, for vectors and for rotations.
+        """
+        frames, joints = np.shape(translations)[:2]
+        
+        vectors = np.stack([
+            np.asarray(translations, dtype=np.float32),
+            np.asarray(scales, dtype=np.float32)
+        ], axis=2).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float32).reshape(-1, 4)
+        
+        vector_indices = self.__pack_approx(vectors, True)
+        rotation_indices = self.__pack_approx(rotations, False)
+        
+        palette_size = max(len(self.transforms), len(self.rotations))
+        if palette_size > 0x10000:
+            raise ValueError(f"Animation needs {palette_size} palette entries, but frame indices are limited to {0x10000}")
+        
+        self.indices = np.empty((frames * joints, 3), dtype=np.uint16)
+        self.indices[:, :2] = vector_indices.reshape(-1, 2)
+        self.indices[:, 2] = rotation_indices
+        
+        return (
+            TransformStorage.__max_error(self.transforms[vector_indices], vectors),
+            TransformStorage.__max_error(self.rotations[rotation_indices], rotations)
+        )
+    
+    @staticmethod
+    def __max_error(packed: np.ndarray, values: np.ndarray) -> float:
+        errors = np.abs(packed - values)
+        return float(np.max(errors[np.isfinite(errors)], initial=0))
     
     def set_translation_approx(self, value: Vector, offset: int) -> int:
-        for i, other in enumerate(self.transforms):
-            if isclose(value.x, other.x, rel_tol=TransformStorage.TransformTolerance) and \
-                isclose(value.y, other.y, rel_tol=TransformStorage.TransformTolerance) and \
-                isclose(value.z, other.z, rel_tol=TransformStorage.TransformTolerance):
-                    self.set_translation_index(i, offset)
-                    return i
+        index = self.find_transform_approx(value)
+        if index is not None:
+            self.set_translation_index(index, offset)
+            return index
         
         return self.add_translation(value, offset)
     
     def set_translation_rough(self, value: Vector, offset: int) -> int:
-        for i, other in enumerate(self.transforms):
-            if other == value:
-                    self.set_translation_index(i, offset)
-                    return i
+        index = self.find_transform(value)
+        if index is not None:
+            self.set_translation_index(index, offset)
+            return index
         
         return self.add_translation(value, offset)
     
     def set_scale_approx(self, value: Vector, offset: int) -> int:
-        for i, other in enumerate(self.transforms):
-            if isclose(value.x, other.x, rel_tol=TransformStorage.TransformTolerance) and \
-                isclose(value.y, other.y, rel_tol=TransformStorage.TransformTolerance) and \
-                isclose(value.z, other.z, rel_tol=TransformStorage.TransformTolerance):
-                    self.set_scale_index(i, offset)
-                    return i
+        index = self.find_transform_approx(value)
+        if index is not None:
+            self.set_scale_index(index, offset)
+            return index
         
         return self.add_scale(value, offset)
     
     def set_scale_rough(self, value: Vector, offset: int) -> int:
-        for i, other in enumerate(self.transforms):
-            if other == value:
-                    self.set_scale_index(i, offset)
-                    return i
+        index = self.find_transform(value)
+        if index is not None:
+            self.set_scale_index(index, offset)
+            return index
         
         return self.add_scale(value, offset)
-        
-    def set_rotation_approx(self, value: Vector, offset: int) -> int:
-        for i, other in enumerate(self.rotations):
-            if isclose(value.x, other.x, rel_tol=TransformStorage.RotationTolerance) and \
-                isclose(value.y, other.y, rel_tol=TransformStorage.RotationTolerance) and \
-                isclose(value.z, other.z, rel_tol=TransformStorage.RotationTolerance) and \
-                isclose(value.w, other.w, rel_tol=TransformStorage.RotationTolerance):
-                    self.set_rotation_index(i, offset)
-                    return i
+    
+    def set_rotation_approx(self, value: Quaternion, offset: int) -> int:
+        index = self.find_rotation_approx(value)
+        if index is not None:
+            self.set_rotation_index(index, offset)
+            return index
         
         return self.add_rotation(value, offset)
-
-    def set_rotation_rough(self, value: Vector, offset: int):
-        for i, other in enumerate(self.rotations):
-            if other == value:
-                    self.set_rotation_index(i, offset)
-                    return
+    
+    def set_rotation_rough(self, value: Quaternion, offset: int) -> int:
+        index = self.find_rotation(value)
+        if index is not None:
+            self.set_rotation_index(index, offset)
+            return index
         
         return self.add_rotation(value, offset)
\ No newline at end of file
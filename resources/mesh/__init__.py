@@ -0,0 +1 @@
+from .material_instance import MeshMaterialInstance
\ No newline at end of file
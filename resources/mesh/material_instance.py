@@ -1,4 +1,3 @@
-import bpy
 from ...reader import Stream
 from abc import abstractmethod
 
@@ -12,11 +11,4 @@ class MeshMaterialInstance:
     
     @abstractmethod
     def read(self, stream: Stream) -> None:
-        pass
-    
-    @abstractmethod
-    def produce_material(self) -> bpy.types.Material:
-        material = bpy.data.materials.new(self.name)
-        material.use_nodes = True
-        
-        return material
\ No newline at end of file
+        pass
\ No newline at end of file
@@ -1,40 +1,150 @@
 from .joint import SkeletonJoint
 from .joint_instance import SkeletonJointInstance
+from .joint_table import SkeletonJointTable, SkeletonJointView
+from .kinematics import SkeletonKinematics
+from ...transform.matrix_utility import MatrixUtility
 from ...reader import Stream
 from ...reader.binary_reader import Whence
+from ...hashing.elf import Elf
 import numpy as np
 
 class SkeletonAsset:
     def __init__(self) -> None:
-        self.joints: list[SkeletonJoint] = []
+        self.table = SkeletonJointTable()
         self.instances: list[SkeletonJointInstance] = []
         self.joints_names: list[str] = []
         
         self.vertex_weight_map: np.ndarray = np.array([], dtype=np.uint16)
         self.name_hash = b"\0\0\0\0"
         self.asset_name_hash = b"\0\0\0\0"
+        
+        self.__indexed: tuple = None
+        self.__kinematics: tuple[SkeletonJointTable, SkeletonKinematics] = None
+    
+    @property
+    def joints(self) -> list[SkeletonJointView]:
+        return self.table.joints
+    
+    @property
+    def kinematics(self) -> SkeletonKinematics:
+        if self.__kinematics is None or self.__kinematics[0] is not self.table:
+            # Parents are stored as joint ids, unknown ids become roots
+            self.__kinematics = (self.table, SkeletonKinematics(self.joint_indices_from_ids(self.table.parents)))
+        
+        return self.__kinematics[1]
     
-    def get_joint_by_id(self, id: int) -> SkeletonJoint | None:
-        return next(
-            (joint for joint in self.joints if joint.id == id), 
-            None,
+    def bind_matrices(self) -> np.ndarray:
+        """Returns (J, 4, 4) world matrices of the bind pose, composed from local joint transforms."""
+        return self.kinematics.world_transforms(
+            self.table.translations,
+            self.table.rotations,
+            self.table.scales
         )
     
-    def get_instance_by_hash(self, hash: bytes) -> SkeletonJointInstance | None:
-        return next(
-            (instance for instance in self.instances if instance.hash == hash),
-            None,
+    def inverse_bind_matrices(self) -> np.ndarray:
+        """Returns (J, 4, 4) inverse bind matrices, as stored in the asset."""
+        return MatrixUtility.compose(
+            self.table.inverse_translations,
+            self.table.inverse_rotations,
+            self.table.inverse_scales
         )
     
-    def read(self, filepath: str) -> None:
-        with open(filepath, "rb") as file:
-            data = file.read()
+    def reindex(self) -> None:
+        """Rebuilds lookup indexes. Called automatically when joints or instances are replaced."""
+        table = self.table
+        
+        self.__joint_by_id: dict[int, int] = {}
+        self.__joint_by_hash: dict[bytes, int] = {}
+        self.__joint_by_name: dict[str, int] = {}
+        self.__joint_by_name_hash: dict[int, int] = {}
+        self.__instance_by_hash: dict[bytes, SkeletonJointInstance] = {}
+        
+        name_hashes = np.array([Elf.lower_hash(name) for name in table.names], dtype=np.uint32)
+        for i, (id, hash, name, name_hash) in enumerate(zip(
+            table.ids.tolist(), table.hashes.tolist(), table.names, name_hashes.tolist()
+        )):
+            self.__joint_by_id.setdefault(id, i)
+            self.__joint_by_hash.setdefault(hash.to_bytes(4, "little"), i)
+            self.__joint_by_name.setdefault(name, i)
+            self.__joint_by_name_hash.setdefault(name_hash, i)
             
-        self.read_stream(Stream(data))
+        for instance in self.instances:
+            self.__instance_by_hash.setdefault(instance.hash, instance)
+        
+        # Sorted keys for vectorized lookups, stable sorting keeps the first of duplicated keys
+        self.__sorted_ids = SkeletonAsset.__sorted_keys(table.ids)
+        self.__sorted_hashes = SkeletonAsset.__sorted_keys(table.hashes)
+        self.__sorted_name_hashes = SkeletonAsset.__sorted_keys(name_hashes)
+        
+        self.__indexed = (table, self.instances, len(self.instances))
+    
+    def __index(self) -> None:
+        if self.__indexed is None or self.__indexed[0] is not self.table or \
+            self.__indexed[1] is not self.instances or self.__indexed[2] != len(self.instances):
+            self.reindex()
+    
+    @staticmethod
+    def __sorted_keys(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(keys, kind="stable")
+        return keys[order], order
+    
+    @staticmethod
+    def __lookup(sorted_keys: tuple[np.ndarray, np.ndarray], values: np.ndarray) -> np.ndarray:
+        keys, order = sorted_keys
+        values = np.asarray(values)
+        
+        if len(keys) == 0:
+            return np.full(values.shape, -1, dtype=np.int64)
+        
+        position = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+        return np.where(keys[position] == values, order[position], -1)
+    
+    def get_joint_by_id(self, id: int) -> SkeletonJointView | None:
+        self.__index()
+        index = self.__joint_by_id.get(id)
+        return None if index is None else self.joints[index]
+    
+    def get_joint_by_hash(self, hash: bytes) -> SkeletonJointView | None:
+        self.__index()
+        index = self.__joint_by_hash.get(hash)
+        return None if index is None else self.joints[index]
+    
+    def get_joint_by_name(self, name: str) -> SkeletonJointView | None:
+        self.__index()
+        index = self.__joint_by_name.get(name)
+        return None if index is None else self.joints[index]
+    
+    def get_joint_by_name_hash(self, name_hash: int) -> SkeletonJointView | None:
+        """Finds joint by `Elf.lower_hash` of its name, as used in animation assets."""
+        self.__index()
+        index = self.__joint_by_name_hash.get(name_hash)
+        return None if index is None else self.joints[index]
+    
+    def get_instance_by_hash(self, hash: bytes) -> SkeletonJointInstance | None:
+        self.__index()
+        return self.__instance_by_hash.get(hash)
+    
+    def joint_indices_from_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Maps an array of joint ids to joint indices, -1 for unknown ids."""
+        self.__index()
+        return SkeletonAsset.__lookup(self.__sorted_ids, ids)
+    
+    def joint_indices_from_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        """Maps an array of joint hashes (as little-endian uint32) to joint indices, -1 for unknown hashes."""
+        self.__index()
+        return SkeletonAsset.__lookup(self.__sorted_hashes, hashes)
+    
+    def joint_indices_from_name_hashes(self, name_hashes: np.ndarray) -> np.ndarray:
+        """Maps an array of `Elf.lower_hash` name hashes to joint indices, -1 for unknown hashes."""
+        self.__index()
+        return SkeletonAsset.__lookup(self.__sorted_name_hashes, name_hashes)
+    
+    def read(self, filepath: str, mmap: bool = True) -> None:
+        self.read_stream(Stream.open(filepath, mmap))
         
     def read_stream(self, stream: Stream) -> None:
         file_size = stream.read_uint32()
-        buffer_size = len(stream.buffer())
+        buffer_size = stream.size()
         
         if (buffer_size != file_size):
             raise ValueError(f"Excepted file size {file_size}, but received buffer with length {buffer_size}")
@@ -57,9 +167,6 @@ class SkeletonAsset:
         stream.read_uint16()
 
         joints_count = stream.read_uint16()
-        self.joints = [SkeletonJoint() for _ in range(joints_count)]
-        self.instances = [SkeletonJointInstance() for _ in range(joints_count)]
-        
         vertex_map_length = stream.read_uint32()
         
         joints_offset = stream.read_uint32()
@@ -75,19 +182,14 @@ class SkeletonAsset:
         stream.seek(20, Whence.CUR)
 
         stream.seek(joints_offset)
-        for joint in self.joints:
-            joint.read(stream)
+        self.table = SkeletonJointTable.read(stream, joints_count)
+        self.joints_names = self.table.names
             
         stream.seek(joints_hashes_offset)
-        for instance in self.instances:
-            instance.read(stream)
+        self.instances = list(stream.read_struct(SkeletonJointInstance, joints_count))
 
-        self.vertex_weight_map = np.frombuffer(
-            stream.buffer(),
-            np.uint16, 
-            vertex_map_length, 
-            vertex_map_offset 
-        )
+        stream.seek(vertex_map_offset)
+        self.vertex_weight_map = stream.read_array(np.uint16, vertex_map_length)
         
         stream.seek(name_offset)
         self.name_hash = stream.read_bytes(4)
@@ -1,7 +1,25 @@
-from mathutils import Vector, Quaternion, Matrix
+from ...transform.vector import Vector
+from ...transform.quaternion import Quaternion
 from ...reader import Stream
+from ...reader.binary_reader import BrLayout, BrStruct
 
-class SkeletonJoint:
+class SkeletonJoint(BrStruct):
+    __br_layout__ = BrLayout(
+        ("flags", "H"),
+        ("id", "H"),
+        ("parent", "H"),
+        (None, "H"),
+        ("hash", "4s"),
+        ("radius", "f"),
+        ("translation", "3f"),
+        ("scale", "3f"),
+        ("rotation", "4f"),
+        ("inverse_translation", "3f"),
+        ("inverse_scale", "3f"),
+        ("inverse_rotation", "4f"),
+        ("name_offset", "I"),
+    )
+    
     def __init__(self) -> None:
         self.name = ""
         self.id: int = 0
@@ -16,31 +34,21 @@ class SkeletonJoint:
         self.inverse_scale = Vector((1, 1, 1))
         self.inverse_rotation = Quaternion()
         
-    def read(self, stream: Stream):
-        # Flags
-        stream.read_uint16()
-        
-        self.id = stream.read_uint16()
-        self.parent = stream.read_uint16()
-        
-        # Unknown
-        stream.read_uint16()
+    def __br_read__(self, stream: Stream, *args) -> None:
+        position = stream.pos()
+        super().__br_read__(stream)
         
-        self.hash = stream.read_bytes(4)
-        self.radius = stream.read_float()
+        self.translation = Vector(self.translation)
+        self.scale = Vector(self.scale)
+        self.rotation = Quaternion(self.rotation)
         
-        self.translation = stream.read_vector()
-        self.scale = stream.read_vector()
-        self.rotation = stream.read_quaternion()
+        self.inverse_translation = Vector(self.inverse_translation)
+        self.inverse_scale = Vector(self.inverse_scale)
+        self.inverse_rotation = Quaternion(self.inverse_rotation)
         
-        self.inverse_translation = stream.read_vector()
-        self.inverse_scale = stream.read_vector()
-        self.inverse_rotation = stream.read_quaternion()
+        # Name offset is relative to its own field, the name itself is resolved by the caller
+        self.name_position = position + SkeletonJoint.__br_layout__.offset("name_offset") + self.name_offset
         
-        name_local_offset = stream.pos()
-        name_offset = stream.read_uint32()
-        
-        pos = stream.pos()
-        stream.seek(name_offset + name_local_offset)
-        self.name = stream.read_str()
-        stream.seek(pos)
\ No newline at end of file
+    def read(self, stream: Stream):
+        self.__br_read__(stream)
+        self.name = stream.read_string_table([self.name_position])[0]
@@ -1,11 +1,16 @@
 from ...reader import Stream
+from ...reader.binary_reader import BrLayout, BrStruct
 
-class SkeletonJointInstance:
+class SkeletonJointInstance(BrStruct):
+    __br_layout__ = BrLayout(
+        ("id", "H"),
+        (None, "H"),
+        ("hash", "4s"),
+    )
+    
     def __init__(self) -> None:
         self.id: int = 0
         self.name_hash: bytes = b"\0\0\0\0"
         
     def read(self, stream: Stream):
-        self.id = stream.read_uint16()
-        stream.read_uint16()
-        self.hash = stream.read_bytes(4)
\ No newline at end of file
+        self.__br_read__(stream)
@@ -0,0 +1,139 @@
+import numpy as np
+from .joint import SkeletonJoint
+from ...reader import Stream
+
+class SkeletonJointView:
+    """Lightweight view of a single joint in SkeletonJointTable, reading its fields on demand."""
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: 'SkeletonJointTable', index: int) -> None:
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.table.names[self.index]
+
+    @property
+    def id(self) -> int:
+        return int(self.table.ids[self.index])
+
+    @property
+    def parent(self) -> int:
+        return int(self.table.parents[self.index])
+
+    @property
+    def hash(self) -> bytes:
+        return self.table.hashes[self.index].tobytes()
+
+    @property
+    def radius(self) -> float:
+        return float(self.table.radii[self.index])
+
+    @property
+    def translation(self) -> np.ndarray:
+        return self.table.translations[self.index]
+
+    @property
+    def scale(self) -> np.ndarray:
+        return self.table.scales[self.index]
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return self.table.rotations[self.index]
+
+    @property
+    def inverse_translation(self) -> np.ndarray:
+        return self.table.inverse_translations[self.index]
+
+    @property
+    def inverse_scale(self) -> np.ndarray:
+        return self.table.inverse_scales[self.index]
+
+    @property
+    def inverse_rotation(self) -> np.ndarray:
+        return self.table.inverse_rotations[self.index]
+
+class SkeletonJointTable:
+    """Struct-of-arrays storage of skeleton joints, backed by one structured array of joint records.
+
+        Rotations are stored in file order (x, y, z, w).
+    """
+
+    def __init__(self, records: np.ndarray = None, names: list[str] = None) -> None:
+        if records is None:
+            records = np.zeros(0, dtype=SkeletonJoint.__br_layout__.dtype())
+
+        self.records = records
+        self.names: list[str] = names if names is not None else [""] * len(records)
+        self.__joints: list[SkeletonJointView] = None
+
+    @staticmethod
+    def read(stream: Stream, count: int) -> 'SkeletonJointTable':
+        layout = SkeletonJoint.__br_layout__
+        position = stream.pos()
+        records = stream.read_array(layout.dtype(), count)
+
+        # Name offsets are relative to their own fields
+        name_positions = position + layout.offset("name_offset") + \
+            np.arange(count, dtype=np.int64) * layout.size + records["name_offset"]
+        names = stream.read_string_table(name_positions.tolist())
+
+        return SkeletonJointTable(records, names)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> SkeletonJointView:
+        return self.joints[index]
+
+    def __iter__(self):
+        return iter(self.joints)
+
+    @property
+    def joints(self) -> list[SkeletonJointView]:
+        if self.__joints is None:
+            self.__joints = [SkeletonJointView(self, i) for i in range(len(self.records))]
+
+        return self.__joints
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.records["id"]
+
+    @property
+    def parents(self) -> np.ndarray:
+        return self.records["parent"]
+
+    @property
+    def hashes(self) -> np.ndarray:
+        # Raw 4-byte hashes as integers, "S4" would strip trailing zero bytes
+        return self.records["hash"].view("<u4")
+
+    @property
+    def radii(self) -> np.ndarray:
+        return self.records["radius"]
+
+    @property
+    def translations(self) -> np.ndarray:
+        return self.records["translation"]
+
+    @property
+    def scales(self) -> np.ndarray:
+        return self.records["scale"]
+
+    @property
+    def rotations(self) -> np.ndarray:
+        return self.records["rotation"]
+
+    @property
+    def inverse_translations(self) -> np.ndarray:
+        return self.records["inverse_translation"]
+
+    @property
+    def inverse_scales(self) -> np.ndarray:
+        return self.records["inverse_scale"]
+
+    @property
+    def inverse_rotations(self) -> np.ndarray:
+        return self.records["inverse_rotation"]
@@ -0,0 +1,51 @@
+import numpy as np
+from ...transform.matrix_utility import MatrixUtility
+
+class SkeletonKinematics:
+    """Forward kinematics over a joint hierarchy.
+
+        Joints are grouped into levels by their depth in the hierarchy once,
+        then world matrices are composed level by level with one batched matmul per level.
+    """
+
+    def __init__(self, parents: np.ndarray) -> None:
+        count = len(parents)
+        parents = np.asarray(parents, dtype=np.int64)
+
+        # Parents out of range (0xFFFF in assets) are roots
+        self.parents = np.where((parents < 0) | (parents >= count), -1, parents)
+
+        depth = np.zeros(count, dtype=np.int64)
+        resolved = self.parents < 0
+        while not resolved.all():
+            candidates = ~resolved
+            ready = candidates & resolved[np.maximum(self.parents, 0)]
+            if not ready.any():
+                raise ValueError("Skeleton hierarchy contains a cycle")
+
+            depth[ready] = depth[self.parents[ready]] + 1
+            resolved |= ready
+
+        self.levels: list[np.ndarray] = [
+            np.flatnonzero(depth == level) for level in range(depth.max(initial=-1) + 1)
+        ]
+
+    def world_matrices(self, local: np.ndarray) -> np.ndarray:
+        """Converts (..., J, 4, 4) parent-relative matrices to world matrices.
+        Any number of leading dimensions is supported, e.g. (F, J, 4, 4) for F frames at once."""
+        local = np.asarray(local)
+        world = np.empty_like(local)
+
+        for i, level in enumerate(self.levels):
+            if i == 0:
+                world[..., level, :, :] = local[..., level, :, :]
+            else:
+                world[..., level, :, :] = world[..., self.parents[level], :, :] @ local[..., level, :, :]
+
+        return world
+
+    def world_transforms(self, translations: np.ndarray, rotations: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Composes parent-relative (..., J, 3) translations, (..., J, 4) rotations and (..., J, 3) scales into (..., J, 4, 4) world matrices."""
+        return self.world_matrices(
+            MatrixUtility.compose(translations, rotations, scales)
+        )
@@ -1,11 +1,11 @@
 import numpy as np
+import numpy.lib.recfunctions as rfn
 from .material_instance import SkinnedMeshMaterialInstance
 from enum import IntEnum
 from ...reader import Stream
-from ...reader.binary_reader import Whence
 from ...transform.bounding_box import BoundingBox
 from ...transform.bounding_sphere import BoundingSphere
-from ...blender.mesh.material_instance import MeshMaterialInstance
+from ..mesh import MeshMaterialInstance
 
 class SkinnedMeshAsset:
     class VertexType(IntEnum):
@@ -14,19 +14,17 @@ class SkinnedMeshAsset:
         Curved = 2 # TANGENT vector
     
     def __init__(self) -> None:
+        self.__attributes: dict[str, np.ndarray] = {}
         self.materials: list[SkinnedMeshMaterialInstance] = []
         self.indices: np.ndarray = np.array([], dtype=np.uint16)
         self.vertex_type = SkinnedMeshAsset.VertexType.Default
-        self.vertex_data: np.ndarray = np.array([], dtype=np.float32)
+        self.vertex_data: np.ndarray = np.zeros(0, dtype=self.dtype)
         
         self.bounding_box = BoundingBox()
         self.bounding_sphere = BoundingSphere()
         
-    def read(self, filepath: str) -> None:
-        with open(filepath, "rb") as file:
-            data = file.read()
-        
-        self.read_stream(Stream(data))
+    def read(self, filepath: str, mmap: bool = True) -> None:
+        self.read_stream(Stream.open(filepath, mmap))
     
     def read_stream(self, stream: Stream) -> None:
         magic = stream.read_uint32()
@@ -45,10 +43,7 @@ class SkinnedMeshAsset:
     
     def read_asset(self, stream: Stream, version: int, revision: int) -> None:
         materials_count = stream.read_uint32()
-        self.materials = [SkinnedMeshMaterialInstance() for _ in range(materials_count)]
-        
-        for material in self.materials:
-            material.read(stream)
+        self.materials = list(stream.read_struct(SkinnedMeshMaterialInstance, materials_count))
         
         if (version == 4):
             # Flags
@@ -71,52 +66,85 @@ class SkinnedMeshAsset:
         if (indices_count % 3 != 0):
             raise ValueError("Indices count is not a multiple of 3")
         
-        self.indices = np.reshape(
-            np.frombuffer(
-                stream.buffer(),
-                np.uint16,
-                indices_count,
-                stream.pos()
-            ),
-            (indices_count // 3, 3)
-        )
-        stream.seek(indices_count * 2, Whence.CUR)
+        self.indices = stream.read_array(np.uint16, (indices_count // 3, 3))
         
         if (vertex_stride % 4 != 0):
             raise ValueError("Vertex stride is not a multiple of 4")
         
-        self.vertex_data = np.frombuffer(
-                stream.buffer(),
-                self.dtype,
-                vertices_count,
-                stream.pos()
-        )
+        self.vertex_data = stream.read_array(self.dtype, vertices_count)
     
     def from_material(self, material: MeshMaterialInstance) -> 'SkinnedMeshAsset':
-        mesh = SkinnedMeshAsset()
-        mesh.vertex_type = self.vertex_type
+        return self.partition([material])[0]
+    
+    @staticmethod
+    def material_triangles(materials: list[MeshMaterialInstance]) -> tuple[np.ndarray, np.ndarray]:
+        """Expands index ranges of materials into triangle indices of all of them, in material order.
+        Returns triangle indices and triangle count of each material."""
+        offsets = np.array([material.indices_offset // 3 for material in materials], dtype=np.int64)
+        counts = np.array([material.indices_count // 3 for material in materials], dtype=np.int64)
+        
+        ends = np.cumsum(counts)
+        triangles = np.repeat(offsets - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)
         
-        mesh_material = SkinnedMeshMaterialInstance()
-        mesh_material.indices_count = material.indices_count
-        mesh_material.vertex_count = material.vertex_count
-        mesh.materials = [mesh_material]
+        return triangles, counts
+    
+    def partition(self, materials: list[MeshMaterialInstance] = None) -> list['SkinnedMeshAsset']:
+        """Splits asset into one submesh per material (all materials by default) in a single vectorized pass.
+        
+            Submeshes share views of the vertex data, while their indices are rebased into one new array,
+            so the indices of this asset are never modified.
+        """
+        if materials is None:
+            materials = self.materials
         
-        mesh.vertex_data = np.zeros(
-            (material.vertex_count,), dtype=self.dtype
-        )
+        triangles, triangle_counts = SkinnedMeshAsset.material_triangles(materials)
+        ends = np.cumsum(triangle_counts)
+        vertex_offsets = np.array([material.vertex_offset for material in materials], dtype=np.int64)
+        vertex_counts = np.array([material.vertex_count for material in materials], dtype=np.int64)
         
-        mesh.indices = np.zeros(
-            (material.indices_count, 3), dtype=np.uint16
-        )
+        # Triangles of all materials in one gather, each shifted by its material vertex offset
+        offsets = np.repeat(vertex_offsets, triangle_counts)[:, np.newaxis]
         
-        indices_offset = material.indices_offset // 3
-        indices_count = material.indices_count // 3
+        indices = self.indices[triangles].astype(np.int64) - offsets
+        if np.any((indices < 0) | (indices >= np.repeat(vertex_counts, triangle_counts)[:, np.newaxis])):
+            raise ValueError("Material references vertices outside of its vertex range")
         
-        mesh.vertex_data = self.vertex_data[material.vertex_offset : material.vertex_offset + material.vertex_count]
-        mesh.indices = self.indices[indices_offset : indices_offset + indices_count]
-        mesh.indices -= material.vertex_offset
+        indices = indices.astype(np.uint16)
+        
+        meshes: list[SkinnedMeshAsset] = []
+        for material, material_indices in zip(materials, np.split(indices, ends[:-1])):
+            mesh = SkinnedMeshAsset()
+            mesh.vertex_type = self.vertex_type
+            
+            mesh_material = SkinnedMeshMaterialInstance()
+            mesh_material.name = material.name
+            mesh_material.indices_count = material.indices_count
+            mesh_material.vertex_count = material.vertex_count
+            mesh.materials = [mesh_material]
+            
+            mesh.vertex_data = self.vertex_data[material.vertex_offset : material.vertex_offset + material.vertex_count]
+            mesh.indices = material_indices
+            meshes.append(mesh)
         
-        return mesh
+        return meshes
+    
+    @property
+    def vertex_type(self) -> 'SkinnedMeshAsset.VertexType':
+        return self.__vertex_type
+    
+    @vertex_type.setter
+    def vertex_type(self, value: 'SkinnedMeshAsset.VertexType') -> None:
+        self.__vertex_type = value
+        self.__attributes.clear()
+    
+    @property
+    def vertex_data(self) -> np.ndarray:
+        return self.__vertex_data
+    
+    @vertex_data.setter
+    def vertex_data(self, value: np.ndarray) -> None:
+        self.__vertex_data = value
+        self.__attributes.clear()
     
     @property
     def has_color(self):
@@ -148,40 +176,50 @@ class SkinnedMeshAsset:
         
         return np.dtype(fields)
     
+    def __attribute(self, fields: tuple[str, ...]) -> np.ndarray:
+        """Returns (N, len(fields)) array of the given vertex fields, cached until vertex data or type is replaced.
+        
+            Fields of the same type that are evenly spaced in the vertex layout are returned as a strided view into vertex data,
+            otherwise as a copy. The result is read-only, copy it before modifying.
+        """
+        array = self.__attributes.get(fields)
+        if array is None:
+            array = rfn.structured_to_unstructured(self.vertex_data[list(fields)])
+            array.flags.writeable = False
+            self.__attributes[fields] = array
+        
+        return array
+    
     @property
     def vertices(self) -> np.ndarray:
-        array = np.zeros(
-            (len(self.vertex_data), 3), 
-            dtype=np.float32
-        )
-        
-        array[:, 0] = self.vertex_data["x"]
-        array[:, 1] = self.vertex_data["y"]
-        array[:, 2] = self.vertex_data["z"]
-
-        return array
+        return self.__attribute(("x", "y", "z"))
     
     @property
     def texcoord(self) -> np.ndarray:
-        array = np.zeros(
-            (len(self.vertex_data), 2), 
-            dtype=np.float32
-        )
-        
-        array[:, 0] = self.vertex_data["u"]
-        array[:, 1] = self.vertex_data["v"]
-        
-        return array
+        return self.__attribute(("u", "v"))
     
     @property
     def normals(self) -> np.ndarray:
-        array = np.zeros(
-            (len(self.vertex_data), 3), 
-            dtype=np.float32
-        )
+        return self.__attribute(("nx", "ny", "nz"))
+    
+    @property
+    def bones(self) -> np.ndarray:
+        return self.__attribute(("bone_1", "bone_2", "bone_3", "bone_4"))
+    
+    @property
+    def weights(self) -> np.ndarray:
+        return self.__attribute(("weight_1", "weight_2", "weight_3", "weight_4"))
+    
+    @property
+    def colors(self) -> np.ndarray | None:
+        if not self.has_color:
+            return None
         
-        array[:, 0] = self.vertex_data["nx"]
-        array[:, 1] = self.vertex_data["ny"]
-        array[:, 2] = self.vertex_data["nz"]
+        return self.__attribute(("r", "g", "b", "a"))
+    
+    @property
+    def tangents(self) -> np.ndarray | None:
+        if not self.has_tangent:
+            return None
         
-        return array
\ No newline at end of file
+        return self.__attribute(("tx", "ty", "tz", "tw"))
\ No newline at end of file
@@ -1,25 +1,27 @@
-from bpy.types import Material
 from ...reader import Stream
-from ...blender.mesh.material_instance import MeshMaterialInstance
+from ...reader.binary_reader import BrLayout, BrStruct
+from ..mesh import MeshMaterialInstance
 
-class SkinnedMeshMaterialInstance(MeshMaterialInstance):
+class SkinnedMeshMaterialInstance(MeshMaterialInstance, BrStruct):
+    __br_layout__ = BrLayout(
+        ("name", "64s"),
+        ("vertex_offset", "I"),
+        ("vertex_count", "I"),
+        ("indices_offset", "I"),
+        ("indices_count", "I"),
+    )
+    
     def __init__(self) -> None:
         super().__init__()
         
-    def read(self, stream: Stream) -> None:
-        self.name = stream.read_str()
+    def __br_read__(self, stream: Stream, *args) -> None:
+        super().__br_read__(stream)
         
-        if (len(self.name) >= 64):
+        name = self.name.split(b"\0", 1)
+        if (len(name) == 1):
             raise ValueError("Material name string is too long!")
         
-        pad_length = 64 - (len(self.name) + 1)
-        stream.read_bytes(pad_length)
+        self.name = name[0].decode()
         
-        self.vertex_offset = stream.read_uint32()
-        self.vertex_count = stream.read_uint32()
-        self.indices_offset = stream.read_uint32()
-        self.indices_count = stream.read_uint32()
-    
-    # A little bit of blender in resources module...
-    def produce_material(self) -> Material:
-        return super().produce_material()
\ No newline at end of file
+    def read(self, stream: Stream) -> None:
+        self.__br_read__(stream)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from mathutils import Vector
+from .vector import Vector
 
 class BoundingSphere:
     def __init__(self) -> None:
@@ -0,0 +1,100 @@
+import numpy as np
+
+class MatrixUtility:
+    """
+        Vectorized transform math over arrays of transforms.
+
+        Quaternions are stored in file order (x, y, z, w), matrices are row-major (..., 4, 4) arrays
+        that transform column vectors, the same convention as mathutils.
+    """
+
+    @staticmethod
+    def quaternion_to_matrix(rotations: np.ndarray) -> np.ndarray:
+        """Converts (..., 4) quaternions to (..., 3, 3) rotation matrices. Quaternions are normalized first."""
+        rotations = np.asarray(rotations, dtype=np.float64)
+        length = np.linalg.norm(rotations, axis=-1, keepdims=True)
+        x, y, z, w = np.moveaxis(rotations / np.where(length == 0, 1, length), -1, 0)
+
+        matrices = np.empty(rotations.shape[:-1] + (3, 3), dtype=np.float64)
+        matrices[..., 0, 0] = 1 - 2 * (y * y + z * z)
+        matrices[..., 0, 1] = 2 * (x * y - z * w)
+        matrices[..., 0, 2] = 2 * (x * z + y * w)
+        matrices[..., 1, 0] = 2 * (x * y + z * w)
+        matrices[..., 1, 1] = 1 - 2 * (x * x + z * z)
+        matrices[..., 1, 2] = 2 * (y * z - x * w)
+        matrices[..., 2, 0] = 2 * (x * z - y * w)
+        matrices[..., 2, 1] = 2 * (y * z + x * w)
+        matrices[..., 2, 2] = 1 - 2 * (x * x + y * y)
+
+        return matrices
+
+    @staticmethod
+    def compose(translations: np.ndarray, rotations: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Composes (..., 3) translations, (..., 4) rotations and (..., 3) scales into (..., 4, 4) matrices (T @ R @ S)."""
+        translations = np.asarray(translations, dtype=np.float64)
+        scales = np.asarray(scales, dtype=np.float64)
+        shape = np.broadcast_shapes(translations.shape[:-1], np.shape(rotations)[:-1], scales.shape[:-1])
+
+        matrices = np.zeros(shape + (4, 4), dtype=np.float64)
+        matrices[..., :3, :3] = MatrixUtility.quaternion_to_matrix(rotations) * scales[..., np.newaxis, :]
+        matrices[..., :3, 3] = translations
+        matrices[..., 3, 3] = 1
+
+        return matrices
+    
+    @staticmethod
+    def euler_to_matrix(angles: np.ndarray, order: str = "XYZ") -> np.ndarray:
+        """Converts (..., 3) euler angles in radians to (..., 3, 3) rotation matrices.
+        Order names axes in the order they are applied, like Blender's rotation modes: "XYZ" gives Rz @ Ry @ Rx."""
+        angles = np.asarray(angles, dtype=np.float64)
+        sin = np.sin(angles)
+        cos = np.cos(angles)
+        
+        axes = {}
+        for axis, (a, b) in zip("XYZ", ((1, 2), (2, 0), (0, 1))):
+            i = "XYZ".index(axis)
+            matrix = np.zeros(angles.shape[:-1] + (3, 3), dtype=np.float64)
+            matrix[..., i, i] = 1
+            matrix[..., a, a] = cos[..., i]
+            matrix[..., b, b] = cos[..., i]
+            matrix[..., a, b] = -sin[..., i]
+            matrix[..., b, a] = sin[..., i]
+            axes[axis] = matrix
+        
+        return axes[order[2]] @ axes[order[1]] @ axes[order[0]]
+    
+    @staticmethod
+    def matrix_to_quaternion(matrices: np.ndarray) -> np.ndarray:
+        """Converts (..., 3, 3) rotation matrices to (..., 4) unit quaternions with non-negative w.
+        Columns are normalized first, so matrices with scale are accepted like in mathutils."""
+        matrices = np.asarray(matrices, dtype=np.float64)
+        matrices = matrices / np.linalg.norm(matrices, axis=-2, keepdims=True)
+        m = [[matrices[..., row, column] for column in range(3)] for row in range(3)]
+        trace = m[0][0] + m[1][1] + m[2][2]
+        
+        # Each candidate is the quaternion scaled by 4 times one of its components,
+        # the one built around the largest component is numerically stable
+        candidates = np.stack([
+            np.stack([1 + m[0][0] - m[1][1] - m[2][2], m[0][1] + m[1][0], m[0][2] + m[2][0], m[2][1] - m[1][2]], axis=-1),
+            np.stack([m[0][1] + m[1][0], 1 - m[0][0] + m[1][1] - m[2][2], m[1][2] + m[2][1], m[0][2] - m[2][0]], axis=-1),
+            np.stack([m[0][2] + m[2][0], m[1][2] + m[2][1], 1 - m[0][0] - m[1][1] + m[2][2], m[1][0] - m[0][1]], axis=-1),
+            np.stack([m[2][1] - m[1][2], m[0][2] - m[2][0], m[1][0] - m[0][1], 1 + trace], axis=-1)
+        ])
+        
+        largest = np.argmax(np.stack([m[0][0], m[1][1], m[2][2], trace]), axis=0)
+        quaternions = np.take_along_axis(candidates, largest[np.newaxis, ..., np.newaxis], axis=0)[0]
+        quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+        
+        return np.where(quaternions[..., 3:] < 0, -quaternions, quaternions)
+    
+    @staticmethod
+    def decompose(matrices: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Splits (..., 4, 4) matrices into (..., 3) translations, (..., 4) rotations and (..., 3) scales.
+        Scales are column lengths, like `to_scale` in mathutils."""
+        matrices = np.asarray(matrices, dtype=np.float64)
+        
+        return (
+            matrices[..., :3, 3].copy(),
+            MatrixUtility.matrix_to_quaternion(matrices[..., :3, :3]),
+            np.linalg.norm(matrices[..., :3, :3], axis=-2)
+        )
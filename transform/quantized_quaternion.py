@@ -1,3 +1,4 @@
+import numpy as np
 from math import fabs
 
 class QuantizedQuaternion:
@@ -43,4 +44,49 @@ class QuantizedQuaternion:
 
         return [(bits >> (8 * i)) & 0b11111111 for i in range(6)]
 
-                
\ No newline at end of file
+    @staticmethod
+    def compress_array(quats: np.ndarray) -> np.ndarray:
+        """Vectorized `compress` of (N, 4) quaternions in (x, y, z, w) order into (N, 6) bytes.
+
+            Largest component (first one on ties) is dropped and the quaternion is negated
+            when it is negative, so the dropped component is restored as a positive square root.
+            Rounding is half to even, same as `round` in `compress`.
+        """
+        quats = np.asarray(quats, dtype=np.float64).reshape(-1, 4)
+        count = len(quats)
+
+        max_index = np.argmax(np.abs(quats), axis=1)
+        rows = np.arange(count)
+        quats = quats * np.where(quats[rows, max_index] < 0, -1.0, 1.0)[:, np.newaxis]
+
+        # Three kept components of each quaternion, in their original order
+        kept = np.arange(3) + (np.arange(3) >= max_index[:, np.newaxis])
+        components = np.round(32767.0 / 2.0 * (QuantizedQuaternion.SQRT_2 * quats[rows[:, np.newaxis], kept] + 1.0))
+        components = components.astype(np.int64) & 0b0111111111111111
+
+        bits = max_index.astype(np.uint64) << np.uint64(45)
+        bits |= (components[:, 0] << 30 | components[:, 1] << 15 | components[:, 2]).astype(np.uint64)
+
+        return bits.astype("<u8").view(np.uint8).reshape(count, 8)[:, :6].copy()
+
+    @staticmethod
+    def decompress_array(data: np.ndarray) -> np.ndarray:
+        """Decompresses (N, 6) bytes into (N, 4) float32 quaternions in (x, y, z, w) order."""
+        data = np.asarray(data, dtype=np.uint8).reshape(-1, 6)
+        count = len(data)
+
+        padded = np.zeros((count, 8), dtype=np.uint8)
+        padded[:, :6] = data
+        bits = padded.view("<u8").reshape(count).astype(np.int64)
+
+        max_index = (bits >> 45) & 0b11
+        components = np.stack([(bits >> 30), (bits >> 15), bits], axis=1) & 0b0111111111111111
+        components = (components / (32767.0 / 2.0) - 1.0) * QuantizedQuaternion.ONE_OVER_SQRT_2
+
+        quats = np.empty((count, 4), dtype=np.float64)
+        rows = np.arange(count)
+        kept = np.arange(3) + (np.arange(3) >= max_index[:, np.newaxis])
+        quats[rows[:, np.newaxis], kept] = components
+        quats[rows, max_index] = np.sqrt(np.maximum(0.0, 1.0 - np.sum(components * components, axis=1)))
+
+        return quats.astype(np.float32)
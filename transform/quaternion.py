@@ -0,0 +1,27 @@
+class Quaternion:
+    """Lightweight quaternion used by the resources package, so it does not depend on `mathutils`.
+    
+        Components are stored and iterated in file order (x, y, z, w), unlike mathutils which uses (w, x, y, z).
+    """
+    __slots__ = ("x", "y", "z", "w")
+    
+    def __init__(self, values=(0.0, 0.0, 0.0, 1.0)) -> None:
+        self.x, self.y, self.z, self.w = (float(value) for value in values)
+        
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+    
+    def __len__(self) -> int:
+        return 4
+    
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y, self.z, self.w)[index]
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        
+        return self.x == other.x and self.y == other.y and self.z == other.z and self.w == other.w
+    
+    def __repr__(self) -> str:
+        return f"Quaternion(({self.x}, {self.y}, {self.z}, {self.w}))"
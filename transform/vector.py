@@ -0,0 +1,24 @@
+class Vector:
+    """Lightweight 3D vector used by the resources package, so it does not depend on `mathutils`."""
+    __slots__ = ("x", "y", "z")
+    
+    def __init__(self, values=(0.0, 0.0, 0.0)) -> None:
+        self.x, self.y, self.z = (float(value) for value in values)
+        
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+    
+    def __len__(self) -> int:
+        return 3
+    
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y, self.z)[index]
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Vector):
+            return NotImplemented
+        
+        return self.x == other.x and self.y == other.y and self.z == other.z
+    
+    def __repr__(self) -> str:
+        return f"Vector(({self.x}, {self.y}, {self.z}))"